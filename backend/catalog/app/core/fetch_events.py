@@ -5,22 +5,7 @@ from fastapi import HTTPException
 import httpx
 from app.schemas.event import EventRead
 
-async def fetch_events_from_scrapercatalog(type: str = 'all') -> List[EventRead]:
-    try:
-        async with httpx.AsyncClient(
-            base_url=settings.scraper_catalog_service_url,
-            timeout=10.0,
-        ) as client:
-            if type == 'all':
-                resp = await client.get("/scraperCatalog/events")
-            else:
-                resp = await client.get(f"/scraperCatalog/events?type={type}")
-    except httpx.RequestError as exc:
-        raise HTTPException(
-            status_code=502,
-            detail=f"scraperCatalog unavailable: {exc}",
-        ) from exc
-
+def _read_page(resp: httpx.Response) -> dict:
     try:
         payload: Union[list, dict] = resp.json()
     except ValueError:
@@ -30,46 +15,51 @@ async def fetch_events_from_scrapercatalog(type: str = 'all') -> List[EventRead]
         detail = payload.get("detail") if isinstance(payload, dict) else payload
         raise HTTPException(status_code=resp.status_code, detail=detail)
 
-    if not isinstance(payload, list):
+    if not isinstance(payload, dict) or not isinstance(payload.get("items"), list):
         raise HTTPException(
             status_code=502,
             detail="Unexpected response from scraperCatalog",
         )
 
-    return [EventRead.model_validate(event) for event in payload]
+    return payload
 
-async def fetch_event_from_scrapercatalog_by_id(event_id:int, event_type: str = 'all') -> List[EventRead]:
+
+async def _fetch_all_pages(path: str, params: Dict[str, Union[str, int]]) -> List[EventRead]:
+    """
+    Списки scraperCatalog отдаются keyset-страницами: идём по next_cursor,
+    пока не придёт последняя страница.
+    """
+    params = {**params, "limit": settings.scraper_catalog_page_size}
+    events: List[EventRead] = []
     try:
         async with httpx.AsyncClient(
             base_url=settings.scraper_catalog_service_url,
             timeout=10.0,
         ) as client:
-                if event_type and event_type != "all":
-                    resp = await client.get(f"/scraperCatalog/events?id={event_id}&type={event_type}")
-                else:
-                    resp = await client.get(f"/scraperCatalog/events?id={event_id}")
+            while True:
+                page = _read_page(await client.get(path, params=params))
+                events.extend(EventRead.model_validate(event) for event in page["items"])
+                if not page.get("next_cursor"):
+                    return events
+                params["cursor"] = page["next_cursor"]
     except httpx.RequestError as exc:
         raise HTTPException(
             status_code=502,
             detail=f"scraperCatalog unavailable: {exc}",
         ) from exc
 
-    try:
-        payload: Union[list, dict] = resp.json()
-    except ValueError:
-        payload = resp.text
-
-    if not resp.is_success:
-        detail = payload.get("detail") if isinstance(payload, dict) else payload
-        raise HTTPException(status_code=resp.status_code, detail=detail)
 
-    if not isinstance(payload, list):
-        raise HTTPException(
-            status_code=502,
-            detail="Unexpected response from scraperCatalog",
-        )
+async def fetch_events_from_scrapercatalog(type: str = 'all') -> List[EventRead]:
+    params: Dict[str, Union[str, int]] = {}
+    if type != 'all':
+        params["type"] = type
+    return await _fetch_all_pages("/scraperCatalog/events", params)
 
-    return [EventRead.model_validate(event) for event in payload]
+async def fetch_event_from_scrapercatalog_by_id(event_id:int, event_type: str = 'all') -> List[EventRead]:
+    params: Dict[str, Union[str, int]] = {"id": event_id}
+    if event_type and event_type != "all":
+        params["type"] = event_type
+    return await _fetch_all_pages("/scraperCatalog/events", params)
 
 
 async def fetch_best_events_from_scrapercatalog(
@@ -81,13 +71,16 @@ async def fetch_best_events_from_scrapercatalog(
         params["type"] = event_type
     if event_id is not None:
         params["id"] = event_id
+    return await _fetch_all_pages("/scraperCatalog/best-events", params)
+
 
+async def _fetch_list(path: str, params: Dict[str, Union[str, int]]) -> List[EventRead]:
     try:
         async with httpx.AsyncClient(
             base_url=settings.scraper_catalog_service_url,
             timeout=10.0,
         ) as client:
-            resp = await client.get("/scraperCatalog/best-events", params=params)
+            resp = await client.get(path, params=params)
     except httpx.RequestError as exc:
         raise HTTPException(
             status_code=502,
@@ -110,3 +103,24 @@ async def fetch_best_events_from_scrapercatalog(
         )
 
     return [EventRead.model_validate(event) for event in payload]
+
+
+async def fetch_upcoming_events_from_scrapercatalog(
+    event_type: str | None = None,
+    limit: int = 20,
+) -> List[EventRead]:
+    params: Dict[str, Union[str, int]] = {"limit": limit}
+    if event_type is not None:
+        params["type"] = event_type
+    return await _fetch_list("/scraperCatalog/events/upcoming", params)
+
+
+async def search_events_in_scrapercatalog(
+    q: str,
+    event_type: str | None = None,
+    limit: int = 20,
+) -> List[EventRead]:
+    params: Dict[str, Union[str, int]] = {"q": q, "limit": limit}
+    if event_type is not None:
+        params["type"] = event_type
+    return await _fetch_list("/scraperCatalog/search", params)
@@ -1,6 +1,4 @@
-from typing import List, Optional
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
+from typing import List
 
 from fastapi import APIRouter, HTTPException, Query, Body
 from app.config import settings
@@ -9,6 +7,8 @@ from app.core.fetch_events import (
     fetch_events_from_scrapercatalog,
     fetch_event_from_scrapercatalog_by_id,
     fetch_best_events_from_scrapercatalog,
+    fetch_upcoming_events_from_scrapercatalog,
+    search_events_in_scrapercatalog,
 )
 from app.core.best_evenst import forward_best_events
 from app.schemas.event import EventRead
@@ -16,7 +16,7 @@ from app.schemas.event import EventRead
 router = APIRouter(prefix="/catalog", tags=["catalog"])
 
 NEAREST_DEFAULT_LIMIT = 20
-DEFAULT_TZ = ZoneInfo("Europe/Moscow")
+SEARCH_DEFAULT_LIMIT = 20
 
 SUPPORTED_TYPES = {
     "concert",
@@ -31,18 +31,6 @@ SUPPORTED_TYPES = {
     "master_class",
 }
 
-def _normalize_dt(dt: datetime) -> datetime:
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=DEFAULT_TZ)
-    return dt.astimezone(DEFAULT_TZ)
-
-def _next_event_datetime(event: EventRead, now: datetime) -> Optional[datetime]:
-    candidates = [_normalize_dt(dt) for dt in (event.date_list or [])]
-    # всегда учитываем date_preview как запасной вариант
-    candidates.append(_normalize_dt(event.date_preview))
-    future = [dt for dt in candidates if dt >= now]
-    return min(future) if future else None
-
 async def _get_events(scope: str) -> List[EventRead]:
     cached = await get_cached_events(scope=scope)
     if cached is not None and len(cached) > 0:
@@ -66,15 +54,18 @@ async def _get_event_by_id(event_id: int, scope: str, ) -> EventRead:
     raise HTTPException(status_code=404, detail="event not found")
 
 async def _get_nearest_events(scope: str, limit: int) -> List[EventRead]:
-    events = await _get_events(scope=scope)
-    now = datetime.now(DEFAULT_TZ)
-    with_next = []
-    for e in events:
-        dt = _next_event_datetime(e, now)
-        if dt:
-            with_next.append((dt, e))
-    with_next.sort(key=lambda x: x[0])
-    return [e for _, e in with_next[:limit]]
+    # порядок по next_occurrence_at считает scraperCatalog по индексу
+    cache_scope = f"nearest:{scope}:{limit}"
+    cached = await get_cached_events(scope=cache_scope)
+    if cached is not None and len(cached) > 0:
+        return cached
+
+    events = await fetch_upcoming_events_from_scrapercatalog(
+        event_type=None if scope == "all" else scope,
+        limit=limit,
+    )
+    await cache_events(events, scope=cache_scope)
+    return events
 
 @router.get("/events", response_model=List[EventRead])
 async def get_events_all(
@@ -109,6 +100,19 @@ async def get_nearest_events(
         scope = t
     return await _get_nearest_events(scope=scope, limit=limit)
 
+@router.get("/events/search", response_model=List[EventRead])
+async def search_events(
+    q: str = Query(..., min_length=2, max_length=200, description="Search query"),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=100),
+    event_type: str | None = Query(None, alias="type", description="Event type"),
+):
+    normalized_type = None
+    if event_type is not None:
+        normalized_type = event_type.lower()
+        if normalized_type not in SUPPORTED_TYPES:
+            raise HTTPException(status_code=404, detail="unsupported event type")
+    return await search_events_in_scrapercatalog(q=q, event_type=normalized_type, limit=limit)
+
 @router.get("/events/best", response_model=List[EventRead])
 async def get_best_events(
     event_id: int | None = Query(None, alias="id", description="Event ID"),
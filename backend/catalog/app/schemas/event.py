@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
@@ -21,5 +21,8 @@ class EventRead(BaseModel):
     genre: Optional[str] = None
     age: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
+    image_status: Optional[str] = None
     url: Optional[str] = None
+    next_occurrence_at: Optional[datetime] = None
     created_at: datetime
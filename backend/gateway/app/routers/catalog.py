@@ -92,6 +92,34 @@ async def list_nearest_events(
     return payload
 
 
+@router.get("/events/search")
+async def search_events(
+    q: str = Query(..., min_length=2, max_length=200, description="Search query"),
+    event_type: str | None = Query(None, alias="type", description="Event type"),
+    limit: int = Query(20, ge=1, le=100, alias="limit", description="Number of events to return"),
+):
+    params = {"q": q, "limit": limit}
+    if event_type is not None:
+        params["type"] = event_type.lower()
+
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            resp = await client.get(f"{settings.catalog_service_url}/catalog/events/search", params=params)
+    except httpx.RequestError as exc:
+        raise HTTPException(502, detail=f"catalog unavailable: {exc}") from exc
+
+    try:
+        payload = resp.json()
+    except ValueError:
+        payload = resp.text
+
+    if not resp.is_success:
+        detail = payload.get("detail") if isinstance(payload, dict) else payload
+        raise HTTPException(status_code=resp.status_code, detail=detail)
+
+    return payload
+
+
 @router.post("/events/post-best")
 async def post_best_events(
     event_ids: List[int] = Body(...,embed=True, description="List of Event IDs"),
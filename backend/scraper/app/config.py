@@ -1,4 +1,6 @@
 import os
+import socket
+
 from pydantic import BaseModel
 
 
@@ -6,8 +8,64 @@ class Settings(BaseModel):
     scraper_catalog_service_url: str = os.getenv("SCRAPER_CATALOG_SERVICE_URL", "http://scrapercatalog:8000")
     redis_url: str = os.getenv("REDIS_URL", "redis://redisScraper:6379/0")
     processed_uuids_key: str = os.getenv("PROCESSED_UUIDS_KEY", "scraper:processed-uuids")
+    # сколько дней после окончания события помнить, что оно уже отправлено
+    processed_retention_days: int = int(os.getenv("PROCESSED_RETENTION_DAYS", "7"))
+    # прогрев дедупликации из scraperCatalog: курсор и размер страницы
+    warmup_cursor_key: str = os.getenv("WARMUP_CURSOR_KEY", "scraper:warmup-cursor")
+    warmup_page_size: int = int(os.getenv("WARMUP_PAGE_SIZE", "5000"))
     scrape_interval_seconds: int = int(os.getenv("SCRAPE_INTERVAL_SECONDS", "600"))
+    # значения по умолчанию для источников, см. ScrapeSource
+    scrape_jitter_seconds: float = float(os.getenv("SCRAPE_JITTER_SECONDS", "30"))
+    scrape_timeout_seconds: float = float(os.getenv("SCRAPE_TIMEOUT_SECONDS", "1800"))
+    scrape_backoff_base_seconds: float = float(os.getenv("SCRAPE_BACKOFF_BASE_SECONDS", "30"))
+    scrape_backoff_max_seconds: float = float(os.getenv("SCRAPE_BACKOFF_MAX_SECONDS", "3600"))
+    # сколько источников скрапится одновременно на всю реплику
+    scrape_max_concurrency: int = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "4"))
     batch_size: int = int(os.getenv("BATCH_SIZE", "100"))
+    # адаптивный размер пачки: стартуем с batch_size и держимся в этих границах
+    batch_size_min: int = int(os.getenv("BATCH_SIZE_MIN", "10"))
+    batch_size_max: int = int(os.getenv("BATCH_SIZE_MAX", "500"))
+    batch_target_latency_seconds: float = float(os.getenv("BATCH_TARGET_LATENCY_SECONDS", "3"))
+    batch_max_bytes: int = int(os.getenv("BATCH_MAX_BYTES", str(2 * 1024 * 1024)))
+    forward_timeout_seconds: float = float(os.getenv("FORWARD_TIMEOUT_SECONDS", "10"))
+    # "auto" — msgpack/zstd, если scraperCatalog их объявил; "json" — всегда JSON
+    forward_wire_format: str = os.getenv("FORWARD_WIRE_FORMAT", "auto")
+    wire_format_ttl_seconds: float = float(os.getenv("WIRE_FORMAT_TTL_SECONDS", "300"))
+    # сколько пачек одновременно «в полёте» к scraperCatalog (1 = последовательно)
+    forward_concurrency: int = int(os.getenv("FORWARD_CONCURRENCY", "4"))
+    # сколько готовых пачек может ждать отправки, пока сборщик не притормозит
+    forward_queue_size: int = int(os.getenv("FORWARD_QUEUE_SIZE", "8"))
+    # через сколько секунд отправлять неполную пачку
+    forward_linger_seconds: float = float(os.getenv("FORWARD_LINGER_SECONDS", "2"))
+
+    # outbox для недоставленных пачек
+    outbox_key: str = os.getenv("OUTBOX_KEY", "scraper:outbox")
+    outbox_max_attempts: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    outbox_backoff_base_seconds: float = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "30"))
+    outbox_backoff_max_seconds: float = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+    outbox_drain_interval_seconds: float = float(os.getenv("OUTBOX_DRAIN_INTERVAL_SECONDS", "10"))
+    outbox_drain_batch: int = int(os.getenv("OUTBOX_DRAIN_BATCH", "20"))
+    outbox_lease_seconds: float = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+    outbox_dead_max: int = int(os.getenv("OUTBOX_DEAD_MAX", "10000"))
+
+    # фоновые задания для /scraper/run и /scraper/results
+    job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+    job_queue_size: int = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+    # сколько хранить законченные задания для GET /scraper/jobs/{id}
+    job_ttl_seconds: float = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+    # задания и их dedup-ключи лежат в Redis, общие для всех реплик
+    jobs_key: str = os.getenv("JOBS_KEY", "scraper:jobs")
+    job_progress_interval_seconds: float = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "2"))
+    # задание без отчёта о прогрессе дольше этого считается потерянным
+    job_lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+
+    # шардирование источников между репликами
+    replica_id: str = os.getenv("REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}"
+    replicas_key: str = os.getenv("REPLICAS_KEY", "scraper:replicas")
+    replica_heartbeat_seconds: float = float(os.getenv("REPLICA_HEARTBEAT_SECONDS", "5"))
+    # реплика без heartbeat дольше этого считается ушедшей
+    replica_ttl_seconds: float = float(os.getenv("REPLICA_TTL_SECONDS", "15"))
+    shard_virtual_nodes: int = int(os.getenv("SHARD_VIRTUAL_NODES", "64"))
 
 
 settings = Settings()
@@ -1,16 +1,37 @@
-from typing import List
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, List
 
+from app.config import settings
 from app.schemas.event import ScrapedEvent
 
 
-async def run_scrape() -> List[ScrapedEvent]:
-    # TODO: реализуйте сбор данных и верните список ScrapedEvent
+@dataclass
+class ScrapeSource:
+    """
+    Источник событий для планировщика: у каждого свой интервал, разброс
+    старта, таймаут, число одновременных запусков и backoff после ошибок.
+    """
+
+    name: str
+    collect: Callable[[], AsyncIterator[ScrapedEvent]]
+    interval_seconds: float = field(default_factory=lambda: settings.scrape_interval_seconds)
+    jitter_seconds: float = field(default_factory=lambda: settings.scrape_jitter_seconds)
+    timeout_seconds: float = field(default_factory=lambda: settings.scrape_timeout_seconds)
+    max_concurrency: int = 1
+    backoff_base_seconds: float = field(default_factory=lambda: settings.scrape_backoff_base_seconds)
+    backoff_max_seconds: float = field(default_factory=lambda: settings.scrape_backoff_max_seconds)
+
+
+async def iter_scrape() -> AsyncIterator[ScrapedEvent]:
+    # TODO: реализуйте сбор данных и отдавайте ScrapedEvent по мере получения
     #
     # Пример:
-    # raw_items = await my_scraper.collect()
-    # return [ScrapedEvent.model_validate(item) for item in raw_items]
+    # async for raw_item in my_scraper.collect():
+    #     yield ScrapedEvent.model_validate(raw_item)
     """
-    Временная заглушка: возвращаем фиксированный список событий.
+    Потоковый контракт сборщика: события отдаются по одному, сразу как
+    собраны, — форвардер отправляет их, не дожидаясь конца скрапа.
+    Временная заглушка: отдаём фиксированный список событий.
     """
     raw_items = [
         {
@@ -99,4 +120,12 @@ async def run_scrape() -> List[ScrapedEvent]:
         },
     ]
 
-    return [ScrapedEvent.model_validate(item) for item in raw_items]
\ No newline at end of file
+    for item in raw_items:
+        yield ScrapedEvent.model_validate(item)
+
+
+# Все источники, которые запускает планировщик (app/services/scheduler.py).
+# Новый сборщик — это async-генератор ScrapedEvent плюс запись здесь.
+SOURCES: List[ScrapeSource] = [
+    ScrapeSource(name="stub", collect=iter_scrape),
+]
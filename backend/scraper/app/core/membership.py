@@ -0,0 +1,26 @@
+import time
+from typing import List
+
+from app.config import settings
+from app.core.redis import redis_client
+
+# Живые реплики scraper: ZSET replica_id -> время последнего heartbeat.
+REPLICAS_KEY = settings.replicas_key
+
+
+async def heartbeat(replica_id: str) -> List[str]:
+    """
+    Отмечаем реплику живой, выкидываем молчащие дольше replica_ttl_seconds
+    и возвращаем текущий состав одним pipeline.
+    """
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zadd(REPLICAS_KEY, {replica_id: now})
+    pipe.zremrangebyscore(REPLICAS_KEY, "-inf", now - settings.replica_ttl_seconds)
+    pipe.zrange(REPLICAS_KEY, 0, -1)
+    _, _, members = await pipe.execute()
+    return list(members)
+
+
+async def leave(replica_id: str) -> None:
+    await redis_client.zrem(REPLICAS_KEY, replica_id)
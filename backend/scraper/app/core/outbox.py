@@ -0,0 +1,107 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.redis import redis_client
+
+# Outbox для пачек, которые не удалось доставить в scraperCatalog.
+#   <key>:due     ZSET  entry_id -> когда пробовать снова (unix ts)
+#   <key>:entries HASH  entry_id -> JSON {"events": [...], "attempts": n, "last_error": ...}
+#   <key>:dead    LIST  JSON записей, исчерпавших outbox_max_attempts
+OUTBOX_KEY = settings.outbox_key
+DUE_KEY = f"{OUTBOX_KEY}:due"
+ENTRIES_KEY = f"{OUTBOX_KEY}:entries"
+DEAD_KEY = f"{OUTBOX_KEY}:dead"
+
+# Забираем готовые записи и сразу сдвигаем их due на время аренды:
+# если реплика упадёт посреди отправки, запись снова станет видна.
+_CLAIM_SCRIPT = redis_client.register_script(
+    """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+    for _, id in ipairs(ids) do
+        redis.call('ZADD', KEYS[1], ARGV[3], id)
+    end
+    return ids
+    """
+)
+
+
+def _backoff_seconds(attempts: int) -> float:
+    delay = settings.outbox_backoff_base_seconds * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.outbox_backoff_max_seconds)
+
+
+def _push_dead(pipe, raw: str) -> None:
+    pipe.lpush(DEAD_KEY, raw)
+    pipe.ltrim(DEAD_KEY, 0, max(settings.outbox_dead_max, 1) - 1)
+
+
+async def enqueue(events: List[dict], attempts: int, last_error: Optional[str]) -> bool:
+    """
+    Кладём недоставленные события (payload scraperCatalog) в outbox.
+    attempts — сколько попыток уже сделано. Возвращает False, если
+    попытки исчерпаны и записи место в dead-letter.
+    """
+    if not events:
+        return True
+
+    entry = {"events": events, "attempts": attempts, "last_error": last_error, "failed_at": time.time()}
+    raw = json.dumps(entry, ensure_ascii=False)
+    if attempts >= settings.outbox_max_attempts:
+        pipe = redis_client.pipeline(transaction=False)
+        _push_dead(pipe, raw)
+        await pipe.execute()
+        return False
+
+    entry_id = uuid.uuid4().hex
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hset(ENTRIES_KEY, entry_id, raw)
+    pipe.zadd(DUE_KEY, {entry_id: time.time() + _backoff_seconds(attempts)})
+    await pipe.execute()
+    return True
+
+
+async def claim_due(limit: int) -> List[Dict[str, Any]]:
+    now = time.time()
+    ids = await _CLAIM_SCRIPT(keys=[DUE_KEY], args=[now, limit, now + settings.outbox_lease_seconds])
+    if not ids:
+        return []
+
+    raws = await redis_client.hmget(ENTRIES_KEY, ids)
+    entries = []
+    for entry_id, raw in zip(ids, raws):
+        if raw is None:
+            await redis_client.zrem(DUE_KEY, entry_id)
+            continue
+        entry = json.loads(raw)
+        entry["id"] = entry_id
+        entries.append(entry)
+    return entries
+
+
+async def ack(entry_id: str) -> None:
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zrem(DUE_KEY, entry_id)
+    pipe.hdel(ENTRIES_KEY, entry_id)
+    await pipe.execute()
+
+
+async def bury(entry_id: str, events: List[dict], attempts: int, error: str) -> None:
+    """Запись, которую повторять бессмысленно: в dead-letter и из outbox."""
+    entry = {"events": events, "attempts": attempts, "last_error": error, "failed_at": time.time()}
+    pipe = redis_client.pipeline(transaction=True)
+    _push_dead(pipe, json.dumps(entry, ensure_ascii=False))
+    pipe.zrem(DUE_KEY, entry_id)
+    pipe.hdel(ENTRIES_KEY, entry_id)
+    await pipe.execute()
+
+
+async def stats() -> Dict[str, int]:
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zcard(DUE_KEY)
+    pipe.zcount(DUE_KEY, "-inf", time.time())
+    pipe.llen(DEAD_KEY)
+    depth, due, dead = await pipe.execute()
+    return {"depth": int(depth), "due": int(due), "dead_letter": int(dead)}
@@ -1,10 +1,12 @@
+import time
+from datetime import datetime, timezone
 from uuid import UUID
 
 import redis.asyncio as redis
 from redis.asyncio.client import Redis
 
 from app.config import settings
-from typing import Iterable 
+from typing import Dict, Iterable, List, Optional, Tuple
 
 def _build_client() -> Redis:
     return redis.from_url(settings.redis_url, decode_responses=True)
@@ -12,23 +14,197 @@ def _build_client() -> Redis:
 
 redis_client: Redis = _build_client()
 
+# Раньше это было одно вечно растущее множество, теперь — префикс корзин
+# вида "<key>:YYYYMMDD" по дню окончания события. Корзина — hash
+# uuid -> отпечаток содержимого; живёт до конца своего дня +
+# processed_retention_days и удаляется Redis сама.
 PROCESSED_SET_KEY = settings.processed_uuids_key
+_BUCKET_SECONDS = 24 * 60 * 60
 
+# Отпечаток неизвестен (uuid пришёл из прогрева по каталогу):
+# первый скрап просто запомнит актуальный отпечаток, не отправляя update.
+UNKNOWN_FINGERPRINT = ""
 
-async def was_processed(event_id: UUID) -> bool:
-    return bool(await redis_client.sismember(PROCESSED_SET_KEY, str(event_id)))
+# Событие переезжает в другую корзину, когда источник добавляет или
+# убирает даты, поэтому искать его по текущему ends_at нельзя. Рядом с
+# корзинами лежит указатель "<key>:at:<uuid>" -> начало корзины с тем же
+# сроком жизни, что и сама корзина.
+_POINTER_PREFIX = f"{PROCESSED_SET_KEY}:at:"
 
+# Локальная копия корзин: bucket key -> (expire_at, {uuid: отпечаток}),
+# и указатели uuid -> bucket key для них.
+# Уже подтверждённые uuid не требуют похода в Redis при повторных скрапах.
+_local_index: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_local_pointers: Dict[str, str] = {}
 
-async def mark_processed(event_id: UUID) -> None:
-    await redis_client.sadd(PROCESSED_SET_KEY, str(event_id))
+ProcessedItem = Tuple[UUID, Optional[datetime]]
+FingerprintItem = Tuple[UUID, Optional[datetime], str]
+
+
+def _bucket_start(ends_at: Optional[datetime]) -> int:
+    if ends_at is None:
+        ts = time.time()
+    else:
+        aware = ends_at if ends_at.tzinfo else ends_at.replace(tzinfo=timezone.utc)
+        ts = aware.timestamp()
+    return int(ts // _BUCKET_SECONDS) * _BUCKET_SECONDS
+
+
+def _bucket_key(bucket_start: int) -> str:
+    day = datetime.fromtimestamp(bucket_start, tz=timezone.utc).strftime("%Y%m%d")
+    return f"{PROCESSED_SET_KEY}:{day}"
+
+
+def _pointer_key(event_id: str) -> str:
+    return f"{_POINTER_PREFIX}{event_id}"
+
+
+def _bucket_expire_at(bucket_start: int, now: float) -> int:
+    # уже прошедшие события держим retention от текущего момента,
+    # иначе корзина удалилась бы сразу и их пересылали бы каждый скрап
+    retention = max(settings.processed_retention_days, 0) * _BUCKET_SECONDS
+    return int(max(bucket_start + _BUCKET_SECONDS, now) + retention)
+
+
+def _group_by_bucket(items: Iterable[FingerprintItem]) -> Dict[int, Dict[str, str]]:
+    grouped: Dict[int, Dict[str, str]] = {}
+    for event_id, ends_at, fingerprint in items:
+        grouped.setdefault(_bucket_start(ends_at), {})[str(event_id)] = fingerprint
+    return grouped
+
+
+def _prune_local(now: float) -> None:
+    for key in [k for k, (expire_at, _) in _local_index.items() if expire_at <= now]:
+        _, cached = _local_index.pop(key)
+        for event_id in cached:
+            if _local_pointers.get(event_id) == key:
+                del _local_pointers[event_id]
+
+
+def _remember_local(bucket_start: int, now: float, fingerprints: Dict[str, str], only_new: bool = False) -> None:
+    key = _bucket_key(bucket_start)
+    _, cached = _local_index.get(key, (0, {}))
+    for event_id, fingerprint in fingerprints.items():
+        previous = _local_pointers.get(event_id)
+        if only_new and previous is not None:
+            continue
+        if previous is not None and previous != key and previous in _local_index:
+            _local_index[previous][1].pop(event_id, None)
+        cached[event_id] = fingerprint
+        _local_pointers[event_id] = key
+    _local_index[key] = (_bucket_expire_at(bucket_start, now), cached)
 
 
 async def close_redis() -> None:
     await redis_client.close()
 
-async def mark_processed_batch(event_ids: Iterable[UUID]) -> int:
-    ids = [str(e) for e in event_ids]
-    if not ids:
+
+async def store_fingerprints(items: Iterable[FingerprintItem]) -> None:
+    """
+    Запоминаем (uuid, время окончания, отпечаток) в корзинах по дню окончания
+    и переставляем указатели uuid -> корзина. Если событие переехало, старая
+    запись удаляется из прежней корзины. Один pipeline на всю пачку.
+    """
+    grouped = _group_by_bucket(items)
+    if not grouped:
+        return
+
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    for bucket_start, fingerprints in grouped.items():
+        key = _bucket_key(bucket_start)
+        expire_at = _bucket_expire_at(bucket_start, now)
+        pipe.hset(key, mapping=fingerprints)
+        pipe.expireat(key, expire_at)
+        for event_id in fingerprints:
+            previous = _local_pointers.get(event_id)
+            if previous is not None and previous != key:
+                pipe.hdel(previous, event_id)
+            pipe.set(_pointer_key(event_id), bucket_start, exat=expire_at)
+    await pipe.execute()
+
+    for bucket_start, fingerprints in grouped.items():
+        _remember_local(bucket_start, now, fingerprints)
+
+
+async def mark_processed_batch(items: Iterable[ProcessedItem]) -> int:
+    """
+    Помечаем uuid отправленными, не зная их отпечатка (прогрев по каталогу).
+    Уже известные uuid не трогаем: и отпечаток (HSETNX), и указатель (SET NX).
+    Возвращает, сколько uuid были новыми.
+    """
+    grouped = _group_by_bucket((event_id, ends_at, UNKNOWN_FINGERPRINT) for event_id, ends_at in items)
+    if not grouped:
         return 0
-    added = await redis_client.sadd(PROCESSED_SET_KEY, *ids)
-    return int(added or 0)
\ No newline at end of file
+
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    for bucket_start, fingerprints in grouped.items():
+        key = _bucket_key(bucket_start)
+        expire_at = _bucket_expire_at(bucket_start, now)
+        for event_id in fingerprints:
+            pipe.set(_pointer_key(event_id), bucket_start, exat=expire_at, nx=True)
+        for event_id in fingerprints:
+            pipe.hsetnx(key, event_id, UNKNOWN_FINGERPRINT)
+        pipe.expireat(key, expire_at)
+    results = await pipe.execute()
+
+    added = 0
+    position = 0
+    for bucket_start, fingerprints in grouped.items():
+        pointed = results[position : position + len(fingerprints)]
+        position += 2 * len(fingerprints) + 1
+        # uuid уже живёт в другой корзине — запись UNKNOWN здесь лишняя,
+        # но безвредна: поиск идёт по указателю
+        new = {event_id: fp for (event_id, fp), flag in zip(fingerprints.items(), pointed) if flag}
+        added += len(new)
+        _remember_local(bucket_start, now, new, only_new=True)
+    return added
+
+
+async def get_fingerprints(items: Iterable[ProcessedItem]) -> Dict[str, str]:
+    """
+    Возвращает {uuid: отпечаток} для уже отправленных uuid из items, в какой
+    бы корзине они ни лежали. Сначала смотрим локальный индекс, для промахов —
+    два pipeline: GET указателей и HMGET по корзинам, на которые они ведут.
+    Записи без указателя (сделанные до его появления) ищем в корзине
+    текущего ends_at.
+    """
+    now = time.time()
+    _prune_local(now)
+
+    found: Dict[str, str] = {}
+    misses: List[Tuple[str, int]] = []
+    for event_id, ends_at in items:
+        event_id = str(event_id)
+        key = _local_pointers.get(event_id)
+        if key is not None:
+            found[event_id] = _local_index[key][1][event_id]
+        else:
+            misses.append((event_id, _bucket_start(ends_at)))
+
+    if not misses:
+        return found
+
+    pointers = await redis_client.mget([_pointer_key(event_id) for event_id, _ in misses])
+    by_bucket: Dict[int, List[str]] = {}
+    for (event_id, fallback), pointer in zip(misses, pointers):
+        by_bucket.setdefault(int(pointer) if pointer else fallback, []).append(event_id)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for bucket_start, ids in by_bucket.items():
+        pipe.hmget(_bucket_key(bucket_start), ids)
+    results = await pipe.execute()
+
+    for (bucket_start, ids), values in zip(by_bucket.items(), results):
+        hits = {event_id: value for event_id, value in zip(ids, values) if value is not None}
+        if hits:
+            found.update(hits)
+            _remember_local(bucket_start, now, hits, only_new=True)
+    return found
+
+
+async def drop_legacy_processed_set() -> None:
+    """Удаляем старое монолитное множество: его заменили корзины с TTL."""
+    if await redis_client.type(PROCESSED_SET_KEY) == "set":
+        await redis_client.unlink(PROCESSED_SET_KEY)
@@ -3,12 +3,14 @@ import logging
 from typing import Optional
 
 from fastapi import FastAPI
+from redis.exceptions import RedisError
 
 from app.core.redis import close_redis
-from app.routers import results
-from app.config import settings
-from app.core.collector import run_scrape
-from app.services.forwarder import forward_events_to_catalog
+from app.routers import metrics, results, sources
+from app.services.jobs import job_manager
+from app.services.outbox import run_outbox_drainer
+from app.services.scheduler import scheduler
+from app.services.sharding import coordinator
 from app.services.init_redis import warmup_processed_from_catalog
 
 app = FastAPI(
@@ -16,8 +18,10 @@ app = FastAPI(
     version="0.1.0",
 )
 
-# Фоновая задача для периодического запуска сборщика.
+# Фоновые задачи: планировщик источников, повторы из outbox и heartbeat реплики.
 _scrape_task: Optional[asyncio.Task] = None
+_outbox_task: Optional[asyncio.Task] = None
+_shard_task: Optional[asyncio.Task] = None
 logger = logging.getLogger(__name__)
 
 
@@ -26,39 +30,42 @@ async def healthz():
     return {"status": "ok", "service": "scraper"}
 
 
-async def _scrape_loop():
-    interval = max(settings.scrape_interval_seconds, 5)
-    while True:
-        try:
-            events = await run_scrape()
-            if events:
-                await forward_events_to_catalog(events)
-        except Exception:  # noqa: BLE001
-            logger.exception("Periodic scrape failed")
-
-        await asyncio.sleep(interval)
-
-
 @app.on_event("startup")
 async def startup_event():
-    global _scrape_task
+    global _scrape_task, _outbox_task, _shard_task
     await warmup_processed_from_catalog()
+    job_manager.start()
+    # узнаём состав реплик до первого прогона, чтобы не скрапить чужие источники
+    try:
+        await coordinator.refresh()
+    except RedisError as exc:
+        logger.warning("Could not register scraper replica: %s", exc)
+    if _shard_task is None:
+        _shard_task = asyncio.create_task(coordinator.run_forever())
     if _scrape_task is None:
-        _scrape_task = asyncio.create_task(_scrape_loop())
+        _scrape_task = asyncio.create_task(scheduler.run_forever())
+    if _outbox_task is None:
+        _outbox_task = asyncio.create_task(run_outbox_drainer())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global _scrape_task  # noqa: PLW0603
-    if _scrape_task:
-        _scrape_task.cancel()
-        try:
-            await _scrape_task
-        except asyncio.CancelledError:
-            pass
-        _scrape_task = None
-
+    global _scrape_task, _outbox_task, _shard_task  # noqa: PLW0603
+    for task in (_scrape_task, _outbox_task, _shard_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _scrape_task = None
+    _outbox_task = None
+    _shard_task = None
+
+    await job_manager.stop()
     await close_redis()
 
 
 app.include_router(results.router)
+app.include_router(sources.router)
+app.include_router(metrics.router)
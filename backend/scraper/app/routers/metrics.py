@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, status
+from redis.exceptions import RedisError
+
+from app.core import outbox
+from app.services.batch_sizer import batch_sizer
+from app.services.sharding import coordinator
+
+router = APIRouter(prefix="/scraper", tags=["scraper"])
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Метрики доставки: depth — записей в outbox, due — из них готовы
+    к повтору, dead_letter — исчерпали попытки; batch_sizer — текущий
+    размер пачки и наблюдения, по которым он выбран; sharding — эта
+    реплика и живые реплики, между которыми делятся источники.
+    """
+    try:
+        outbox_stats = await outbox.stats()
+    except RedisError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Redis unavailable: {exc}",
+        ) from exc
+
+    return {
+        "outbox": outbox_stats,
+        "batch_sizer": batch_sizer.snapshot(),
+        "sharding": coordinator.snapshot(),
+    }
@@ -1,42 +1,94 @@
-from fastapi import APIRouter, HTTPException, status
+import hashlib
+
+from fastapi import APIRouter, HTTPException, Query, status
 from redis.exceptions import RedisError
 
-from app.core.collector import run_scrape
+from app.core.collector import iter_scrape
 from app.schemas.event import ScrapedEventsBatch
-from app.services.forwarder import forward_events_to_catalog
+from app.services.forwarder import forward_event_stream, forward_events_to_catalog
+from app.services.jobs import JobQueueFull, job_manager
 
 router = APIRouter(prefix="/scraper", tags=["scraper"])
 
 
+def _redis_unavailable(exc: RedisError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Redis unavailable: {exc}",
+    )
+
+
+def _batch_key(batch: ScrapedEventsBatch) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted(f"{event.uuid}:{event.fingerprint()}" for event in batch.events):
+        digest.update(key.encode())
+    return f"results:{digest.hexdigest()}"
+
+
+def _accepted(job: dict, deduplicated: bool) -> dict:
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "deduplicated": deduplicated,
+        "status_url": f"{router.prefix}/jobs/{job['job_id']}",
+    }
+
+
+async def _submit(kind: str, dedup_key: str, run, total=None) -> dict:
+    try:
+        job, deduplicated = await job_manager.submit(kind, dedup_key, run, total=total)
+    except JobQueueFull as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    except RedisError as exc:
+        raise _redis_unavailable(exc) from exc
+    return _accepted(job, deduplicated)
+
+
 @router.post("/results", status_code=status.HTTP_202_ACCEPTED)
-async def accept_results(batch: ScrapedEventsBatch):
+async def accept_results(batch: ScrapedEventsBatch, wait: bool = Query(False)):
     """
-    Принимаем пачку собранных событий, отправляем их в scraperCatalog
-    и сохраняем uuid в Redis для дедупликации.
+    Принимаем пачку собранных событий и ставим отправку в scraperCatalog
+    в очередь заданий; прогресс — GET /scraper/jobs/{id}.
+    wait=true — старое поведение: ждём и возвращаем summary.
     """
-    try:
-        summary = await forward_events_to_catalog(batch.events)
-    except RedisError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Redis unavailable: {exc}",
-        ) from exc
+    if wait:
+        try:
+            return await forward_events_to_catalog(batch.events)
+        except RedisError as exc:
+            raise _redis_unavailable(exc) from exc
+
+    events = batch.events
+
+    async def run(summary):
+        return await forward_events_to_catalog(events, summary=summary)
 
-    return summary
+    return await _submit("results", _batch_key(batch), run, total=len(events))
 
 
 @router.post("/run", status_code=status.HTTP_202_ACCEPTED)
-async def run_and_forward():
+async def run_and_forward(wait: bool = Query(False)):
     """
-    Запускаем сбор данных из core-логики и сразу отправляем результаты.
+    Запускаем сбор данных из core-логики с отправкой результатов в фоне.
+    Пока один прогон идёт, повторные вызовы возвращают его job_id.
     """
+    if wait:
+        try:
+            return await forward_event_stream(iter_scrape())
+        except RedisError as exc:
+            raise _redis_unavailable(exc) from exc
+
+    async def run(summary):
+        return await forward_event_stream(iter_scrape(), summary=summary)
+
+    return await _submit("run", "run", run)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
     try:
-        events = await run_scrape()
-        summary = await forward_events_to_catalog(events)
+        job = await job_manager.get(job_id)
     except RedisError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Redis unavailable: {exc}",
-        ) from exc
-
-    return summary
+        raise _redis_unavailable(exc) from exc
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.services.scheduler import scheduler
+
+router = APIRouter(prefix="/scraper", tags=["scraper"])
+
+
+@router.get("/sources")
+async def list_sources():
+    """
+    Состояние источников планировщика: последний запуск, длительность,
+    статус, ошибки подряд и время следующего запуска.
+    """
+    return scheduler.snapshot()
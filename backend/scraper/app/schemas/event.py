@@ -1,10 +1,17 @@
-from datetime import datetime
+import hashlib
+import json
+from datetime import datetime, timezone
 from uuid import UUID
 from typing import List, Optional
 
 from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
 
+def _to_aware(dt: datetime) -> datetime:
+    # источники присылают даты и с поясом, и без; без пояса считаем UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
 class ScrapedEvent(BaseModel):
     model_config = ConfigDict(populate_by_name=True, extra="ignore")
 
@@ -31,6 +38,25 @@ class ScrapedEvent(BaseModel):
     image_url: str
     url: str
 
+    def ends_at(self) -> datetime:
+        """
+        Последняя известная дата события: по ней выбирается корзина
+        дедупликации и считается, сколько хранить uuid.
+        """
+        return max(_to_aware(dt) for dt in [*self.date_list, self.date_preview])
+
+    def fingerprint(self) -> str:
+        """
+        Отпечаток содержимого вида "<content>:<image>". Картинка считается
+        отдельно: по ней scraperCatalog решает, надо ли заново качать изображение.
+        """
+        payload = self.to_catalog_payload()
+        image_url = payload.pop("image_url")
+        content = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        content_hash = hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+        image_hash = hashlib.blake2b(image_url.encode(), digest_size=8).hexdigest()
+        return f"{content_hash}:{image_hash}"
+
     def to_catalog_payload(self) -> dict:
         """
         Приводим события к формату, который ожидает scraperCatalog.
@@ -44,7 +70,7 @@ class ScrapedEvent(BaseModel):
             "description": self.description,
             "price": self.price,
             "date_preview": self.date_preview.isoformat() if self.date_preview else None,
-            "date_list": [d.isoformat() for d in self.date_list] if self.date_list else None,
+            "date_list": [d.isoformat() for d in self.date_list],
             "place": self.place,
             "genre": self.genre,
             "age": self.age,
@@ -0,0 +1,91 @@
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+class AdaptiveBatchSizer:
+    """
+    Подбирает размер пачки для scraperCatalog по тому, как прошли прошлые:
+    держим время ответа около target_latency и тело не больше max_bytes,
+    при ошибках/таймаутах режем пачку вдвое. Размер всегда в [min_size, max_size].
+    """
+
+    # сглаживание наблюдений и максимальный рост за один шаг
+    _ALPHA = 0.3
+    _MAX_GROWTH = 1.5
+
+    def __init__(
+        self,
+        initial: int,
+        min_size: int,
+        max_size: int,
+        target_latency: float,
+        max_bytes: int,
+    ):
+        self.min_size = max(min_size, 1)
+        self.max_size = max(max_size, self.min_size)
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self._size = float(self._clamp(initial))
+        self.seconds_per_event: Optional[float] = None
+        self.bytes_per_event: Optional[float] = None
+        self.failure_rate = 0.0
+        self.last_latency: Optional[float] = None
+        self.observed = 0
+
+    def _clamp(self, size: float) -> int:
+        return int(min(max(size, self.min_size), self.max_size))
+
+    def _smooth(self, previous: Optional[float], value: float) -> float:
+        return value if previous is None else previous + self._ALPHA * (value - previous)
+
+    @property
+    def current(self) -> int:
+        return self._clamp(self._size)
+
+    def observe(self, events: int, latency: float, payload_bytes: int, failed: bool) -> None:
+        if events <= 0:
+            return
+        self.observed += 1
+        self.last_latency = latency
+        self.failure_rate = self._smooth(self.failure_rate, 1.0 if failed else 0.0)
+
+        if failed:
+            self._size = self._clamp(self._size / 2)
+            return
+
+        self.seconds_per_event = self._smooth(self.seconds_per_event, latency / events)
+        self.bytes_per_event = self._smooth(self.bytes_per_event, payload_bytes / events)
+
+        desired = float(self.max_size)
+        if self.seconds_per_event > 0:
+            desired = min(desired, self.target_latency / self.seconds_per_event)
+        if self.bytes_per_event > 0:
+            desired = min(desired, self.max_bytes / self.bytes_per_event)
+        # пока ошибки свежи — не разгоняемся
+        if self.failure_rate > 0.1:
+            desired = min(desired, self._size)
+
+        self._size = self._clamp(min(desired, self._size * self._MAX_GROWTH))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "current": self.current,
+            "min": self.min_size,
+            "max": self.max_size,
+            "target_latency_seconds": self.target_latency,
+            "last_latency_seconds": self.last_latency,
+            "seconds_per_event": self.seconds_per_event,
+            "bytes_per_event": self.bytes_per_event,
+            "failure_rate": round(self.failure_rate, 3),
+            "observed_batches": self.observed,
+        }
+
+
+batch_sizer = AdaptiveBatchSizer(
+    initial=settings.batch_size,
+    min_size=settings.batch_size_min,
+    max_size=settings.batch_size_max,
+    target_latency=settings.batch_target_latency_seconds,
+    max_bytes=settings.batch_max_bytes,
+)
@@ -1,74 +1,283 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
 from uuid import UUID
 
 import httpx
 from app.config import settings
-from app.core.redis import mark_processed, was_processed
+from app.core import outbox
+from app.core.redis import UNKNOWN_FINGERPRINT, get_fingerprints, store_fingerprints
 from app.schemas.event import ScrapedEvent
+from app.services import wire_format
+from app.services.batch_sizer import batch_sizer
 
-def _chunked(seq, size):
-    for i in range(0, len(seq), size):  # шаг size, не 1
-        yield seq[i : i + size]
+UPLOAD_BATCH_PATH = "/scraperCatalog/upload/batch"
+UPDATE_BATCH_PATH = "/scraperCatalog/update/batch"
+
+
+def _fail_all(failed: List[dict], payload: List[dict], status_code: int, detail: str) -> None:
+    for item in payload:
+        failed.append({"uuid": str(item["uuid"]), "status_code": status_code, "detail": detail})
+
+
+async def _post_batch(
+    client: httpx.AsyncClient, path: str, payload: List[dict], summary: Dict[str, Any], failed: List[dict]
+) -> Optional[Dict[str, Any]]:
+    """
+    Отправляем пачку; при ошибке транспорта/ответа пишем её целиком в failed.
+    Тело кодируется в формат, который объявил scraperCatalog (msgpack +
+    zstd/gzip, иначе JSON). Время ответа и размер тела уходят в batch_sizer.
+    """
+    summary["batches"] += 1
+    content, headers = wire_format.encode_body({"events": payload}, await wire_format.negotiate(client))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        resp = await client.post(path, content=content, headers=headers)
+    except httpx.RequestError as exc:
+        batch_sizer.observe(len(payload), loop.time() - started, len(content), failed=True)
+        _fail_all(failed, payload, 502, f"scraperCatalog unavailable: {exc}")
+        return None
+
+    batch_sizer.observe(len(payload), loop.time() - started, len(content), failed=not resp.is_success)
+    if not resp.is_success:
+        if resp.status_code == 415:
+            # каталог откатили на версию без msgpack/zstd — договоримся заново
+            wire_format.reset_negotiation()
+        _fail_all(failed, payload, resp.status_code, resp.text)
+        return None
+
+    try:
+        return resp.json()
+    except ValueError:
+        _fail_all(failed, payload, resp.status_code, "bad json")
+        return None
+
+
+async def _enqueue_retry(
+    chunk: List[ScrapedEvent], failed: List[dict], retry_attempts: int, summary: Dict[str, Any]
+) -> None:
+    failed_ids = {str(item.get("uuid")) for item in failed}
+    events = [event.to_catalog_payload() for event in chunk if str(event.uuid) in failed_ids]
+    if not events:
+        return
+    detail = failed[0].get("detail") or failed[0].get("reason")
+    if await outbox.enqueue(events, attempts=retry_attempts + 1, last_error=detail):
+        summary["retry_queued"] += len(events)
+    else:
+        summary["dead_lettered"] += len(events)
+
+
+async def _forward_chunk(
+    client: httpx.AsyncClient, chunk: List[ScrapedEvent], summary: Dict[str, Any], retry_attempts: int
+) -> None:
+    ends_at = {str(event.uuid): event.ends_at() for event in chunk}
+    fingerprints = {str(event.uuid): event.fingerprint() for event in chunk}
+    stored = await get_fingerprints((event.uuid, ends_at[str(event.uuid)]) for event in chunk)
+
+    new_payload: List[dict] = []
+    changed_payload: List[dict] = []
+    # что записать в Redis по итогам пачки
+    acknowledged: List[str] = []
+    failed: List[dict] = []
+    for event in chunk:
+        event_id = str(event.uuid)
+        previous = stored.get(event_id)
+        if previous is None:
+            new_payload.append(event.to_catalog_payload())
+        elif previous == fingerprints[event_id]:
+            summary["skipped"] += 1
+        elif previous == UNKNOWN_FINGERPRINT:
+            # uuid из прогрева: считаем, что в каталоге актуальная версия
+            acknowledged.append(event_id)
+            summary["skipped"] += 1
+        else:
+            item = event.to_catalog_payload()
+            item["refresh_image"] = previous.split(":")[-1] != fingerprints[event_id].split(":")[-1]
+            changed_payload.append(item)
+
+    if new_payload:
+        body = await _post_batch(client, UPLOAD_BATCH_PATH, new_payload, summary, failed)
+        if body is not None:
+            created = body.get("created", [])
+            skipped = body.get("skipped", [])
+            new_by_uuid = {item["uuid"]: item for item in new_payload}
+            # unsupported_type / no_image_url не помечаем: источник может исправиться
+            acknowledged += [item["uuid"] for item in created]
+            for item in skipped:
+                if item.get("reason") == "already_exists" and item["uuid"] in new_by_uuid:
+                    # в каталоге есть, а какой версии — мы не знаем (Redis
+                    # потерял запись): отправляем как изменение. Картинку
+                    # каталог по известному URL заново не скачивает.
+                    changed_payload.append({**new_by_uuid[item["uuid"]], "refresh_image": True})
+                else:
+                    summary["skipped"] += 1
+            summary["sent"] += len(created)
+            failed.extend(body.get("failed", []))
+
+    if changed_payload:
+        body = await _post_batch(client, UPDATE_BATCH_PATH, changed_payload, summary, failed)
+        if body is not None:
+            updated = body.get("updated", [])
+            skipped = body.get("skipped", [])
+            # not_found — событие уже в архиве, повторять update бессмысленно
+            acknowledged += [item["uuid"] for item in updated]
+            acknowledged += [item["uuid"] for item in skipped if item.get("reason") == "not_found"]
+            summary["updated"] += len(updated)
+            summary["skipped"] += len(skipped)
+            failed.extend(body.get("failed", []))
+
+    await store_fingerprints(
+        (UUID(event_id), ends_at[event_id], fingerprints[event_id])
+        for event_id in acknowledged
+        if event_id in fingerprints
+    )
+    if failed:
+        summary["failed"].extend(failed)
+        await _enqueue_retry(chunk, failed, retry_attempts, summary)
+
+
+def _record_batch_size(stats: Dict[str, Any], size: int) -> None:
+    stats["count"] += 1
+    stats["min"] = size if stats["min"] is None else min(stats["min"], size)
+    stats["max"] = size if stats["max"] is None else max(stats["max"], size)
+    stats["last"] = size
+
+
+async def _next_event(iterator: AsyncIterator[ScrapedEvent]) -> ScrapedEvent:
+    return await anext(iterator)
+
+
+async def _produce_chunks(
+    events: AsyncIterable[ScrapedEvent],
+    queue: "asyncio.Queue[Optional[List[ScrapedEvent]]]",
+    workers_count: int,
+    summary: Dict[str, Any],
+) -> None:
+    linger = max(settings.forward_linger_seconds, 0)
+    loop = asyncio.get_running_loop()
+    iterator = aiter(events)
+
+    chunk: List[ScrapedEvent] = []
+    started = loop.time()
+    batch_size = batch_sizer.current
+
+    async def flush() -> None:
+        nonlocal chunk
+        _record_batch_size(summary["batch_size"], len(chunk))
+        await queue.put(chunk)  # ждёт, пока воркеры разгребут очередь
+        chunk = []
+
+    # следующее событие ждём отдельной задачей: по таймауту её не отменяем,
+    # чтобы не оборвать генератор источника посреди работы
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.create_task(_next_event(iterator))
+            # неполную пачку отпускаем по таймауту, даже если источник
+            # замолчал, чтобы он не держал уже собранные события
+            timeout = max(started + linger - loop.time(), 0) if chunk else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                await flush()
+                continue
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                break
+
+            if not chunk:
+                started = loop.time()
+                # размер берём заново для каждой пачки: sizer учится на ответах
+                batch_size = batch_sizer.current
+            chunk.append(event)
+            if len(chunk) >= batch_size:
+                await flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
+    if chunk:
+        await flush()
+    for _ in range(workers_count):
+        await queue.put(None)
+
+
+def new_summary() -> Dict[str, Any]:
+    return {
+        "sent": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": [],
+        "retry_queued": 0,
+        "dead_lettered": 0,
+        "batches": 0,
+        # сводка по выбранным размерам пачек, а не список: прогон может быть долгим
+        "batch_size": {"count": 0, "min": None, "max": None, "last": None},
+    }
+
+
+async def forward_event_stream(
+    events: AsyncIterable[ScrapedEvent],
+    concurrency: Optional[int] = None,
+    retry_attempts: int = 0,
+    summary: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Отправляем события по мере поступления пачками; размер пачки
+    подбирает batch_sizer в пределах settings.batch_size_min/max.
+    Между сборщиком и отправкой — очередь на settings.forward_queue_size
+    пачек: если scraperCatalog не успевает, сборщик ждёт, память ограничена.
+    Одновременно в полёте не больше concurrency пачек (по умолчанию
+    settings.forward_concurrency), все они идут через один пул соединений.
+    Новые события идут в upload/batch, изменившиеся (другой отпечаток) —
+    в update/batch, неизменные стоят только сравнения отпечатков.
+    Если на upload каталог ответил already_exists, событие досылается в
+    update/batch: его версия в каталоге нам неизвестна.
+    sent + updated + skipped + len(failed) == числу событий.
+    Всё из failed уходит в outbox (retry_queued) или, если попытки
+    исчерпаны, в dead-letter (dead_lettered). retry_attempts — сколько
+    попыток у этих событий уже было (для повторов из outbox).
+    Можно передать свой summary (из new_summary()) и следить за ним по ходу.
+    """
+    if summary is None:
+        summary = new_summary()
+    workers_count = max(concurrency or settings.forward_concurrency, 1)
+    queue: "asyncio.Queue[Optional[List[ScrapedEvent]]]" = asyncio.Queue(
+        maxsize=max(settings.forward_queue_size, 1)
+    )
 
-async def forward_events_to_catalog(events: List[ScrapedEvent]) -> Dict[str, Any]:
-    summary: Dict[str, Any] = {"sent": 0, "skipped": 0, "failed": []}
-    batch_size = settings.batch_size
     async with httpx.AsyncClient(
         base_url=settings.scraper_catalog_service_url,
-        timeout=10.0,
+        timeout=settings.forward_timeout_seconds,
+        limits=httpx.Limits(max_connections=workers_count, max_keepalive_connections=workers_count),
     ) as client:
-        for chunk in _chunked(events, batch_size):
-            payload = []
-            for event in chunk:
-                event_id: UUID = event.uuid
-                if await was_processed(event_id):
-                    summary["skipped"] += 1
-                    continue
-                payload.append(event.to_catalog_payload())
-            
-            if not payload:
-                continue
 
-            try:
-                resp = await client.post("/scraperCatalog/upload/batch", json={"events": payload})
-            except httpx.RequestError as exc:
-                summary["failed"].append(
-                    {
-                        "uuids": [str(item["uuid"]) for item in payload],
-                        "status_code": 502,
-                        "detail": f"scraperCatalog unavailable: {exc}",
-                    }
-                )
-                continue
+        async def worker() -> None:
+            while (chunk := await queue.get()) is not None:
+                await _forward_chunk(client, chunk, summary, retry_attempts)
+
+        tasks = [asyncio.create_task(_produce_chunks(events, queue, workers_count, summary))]
+        tasks += [asyncio.create_task(worker()) for _ in range(workers_count)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
 
-            if resp.is_success:
-                try:
-                    request_body = resp.json()
-                except ValueError:
-                    for item in payload:
-                        summary["failed"].append(
-                            {"uuid": str(item["uuid"]), "status_code": resp.status_code, "detail": "bad json"}
-                        )
-                    continue
-                request_body = resp.json()
-                created = request_body.get("created", [])
-                skipped = request_body.get("skipped", [])
-                failed = request_body.get("failed", [])
-                for item in created:
-                    event_id: UUID = UUID(item["uuid"])
-                    await mark_processed(event_id)
-                    summary["sent"] += 1
-                for item in skipped:
-                    if item.get("reason") == "already_exists":
-                        await mark_processed(UUID(item["uuid"]))
-                        summary["skipped"] += 1
-                summary["failed"].extend(failed)
-            else:
-                detail = resp.text
-                status_code = resp.status_code
-                for item in payload:
-                    summary["failed"].append(
-                        {"uuid": str(item["uuid"]), "status_code": status_code, "detail": detail}
-                    )
-           
     return summary
+
+
+async def forward_events_to_catalog(
+    events: List[ScrapedEvent],
+    concurrency: Optional[int] = None,
+    retry_attempts: int = 0,
+    summary: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    async def _iterate() -> AsyncIterator[ScrapedEvent]:
+        for event in events:
+            yield event
+
+    return await forward_event_stream(
+        _iterate(), concurrency=concurrency, retry_attempts=retry_attempts, summary=summary
+    )
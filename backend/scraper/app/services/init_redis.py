@@ -1,42 +1,77 @@
 import logging
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 import httpx
 
 from app.config import settings
-from app.core.redis import mark_processed_batch
+from app.core.redis import ProcessedItem, drop_legacy_processed_set, mark_processed_batch, redis_client
 
 logger = logging.getLogger(__name__)
 
-async def _fetch_catalog_uuids() -> List[UUID]:
-    async with httpx.AsyncClient(
-        base_url=settings.scraper_catalog_service_url,
-        timeout=10.0,
-    ) as client:
-        resp = await client.get("/scraperCatalog/events")
-        resp.raise_for_status()
-        try:
-            data = resp.json()
-        except ValueError as exc:
-            logger.warning("Bad JSON from scraperCatalog: %s", exc)
-            return []
-    uuids: List[UUID] = []
-    for item in data:
+UUIDS_PATH = "/scraperCatalog/uuids"
+
+
+async def _fetch_uuid_page(
+    client: httpx.AsyncClient, cursor: Optional[str]
+) -> Tuple[List[ProcessedItem], Optional[str], bool]:
+    """
+    Страница uuid с каталога: (валидные элементы, следующий курсор, есть ли
+    ещё страницы). Битые элементы пропускаем, но страницу считаем по всем
+    элементам, иначе прогрев остановился бы на первой же битой записи.
+    """
+    params = {"limit": settings.warmup_page_size}
+    if cursor:
+        params["since"] = cursor
+    resp = await client.get(UUIDS_PATH, params=params)
+    resp.raise_for_status()
+    try:
+        data = resp.json()
+    except ValueError as exc:
+        logger.warning("Bad JSON from scraperCatalog: %s", exc)
+        return [], cursor, False
+
+    items = data.get("items", [])
+    uuids: List[ProcessedItem] = []
+    for item in items:
         try:
-            uuids.append(UUID(str(item["uuid"])))
-        except (KeyError, ValueError):
+            ends_at = datetime.fromisoformat(item["ends_at"]) if item.get("ends_at") else None
+            uuids.append((UUID(str(item["uuid"])), ends_at))
+        except (KeyError, TypeError, ValueError):
             logger.warning("Skip invalid catalog item while bootstrapping: %s", item)
-    return uuids
+    next_cursor = data.get("next_cursor") or cursor
+    has_more = len(items) >= settings.warmup_page_size and next_cursor != cursor
+    return uuids, next_cursor, has_more
+
 
 async def warmup_processed_from_catalog() -> int:
+    """
+    Дочитываем uuid из scraperCatalog (active, inactive, best) с места,
+    где остановились в прошлый раз: курсор хранится в Redis. В памяти
+    одновременно только одна страница.
+    """
+    await drop_legacy_processed_set()
+    cursor = await redis_client.get(settings.warmup_cursor_key)
+    total = 0
+    added = 0
     try:
-        uuids = await _fetch_catalog_uuids()
+        async with httpx.AsyncClient(
+            base_url=settings.scraper_catalog_service_url,
+            timeout=10.0,
+        ) as client:
+            while True:
+                uuids, next_cursor, has_more = await _fetch_uuid_page(client, cursor)
+                if uuids:
+                    added += await mark_processed_batch(uuids)
+                    total += len(uuids)
+                if next_cursor and next_cursor != cursor:
+                    cursor = next_cursor
+                    await redis_client.set(settings.warmup_cursor_key, cursor)
+                if not has_more:
+                    break
     except httpx.HTTPError as exc:
-        logger.warning("Could not fetch catalog events: %s", exc)
-        return 0
-    if not uuids:
-        return 0
-    added = await mark_processed_batch(uuids)
-    logger.info("Bootstrapped %d catalog events into processed set (new: %d)", len(uuids), added)
+        logger.warning("Could not fetch catalog uuids: %s", exc)
+
+    logger.info("Bootstrapped %d catalog events into processed set (new: %d)", total, added)
     return added
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.core.redis import redis_client
+from app.services.forwarder import new_summary
+
+logger = logging.getLogger(__name__)
+
+# Задание получает живой summary форвардера и заполняет его по ходу работы.
+JobRunner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# Задания лежат в Redis, чтобы их видели все реплики и воркеры uvicorn:
+#   <key>:<job_id>       HASH    kind, status, даты, progress/summary (JSON), error
+#   <key>:dedup:<dedup>  STRING  job_id активного задания; TTL — аренда,
+#                                её продлевает процесс, выполняющий задание
+# Выполняет задание тот процесс, который его принял.
+JOBS_KEY = settings.jobs_key
+
+# Снимаем dedup-ключ, только если он всё ещё указывает на наше задание.
+_RELEASE_SCRIPT = redis_client.register_script(
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+# Меняем dedup-ключ на новое задание, только если он всё ещё указывает на старое.
+_REPLACE_SCRIPT = redis_client.register_script(
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        return 1
+    end
+    return 0
+    """
+)
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOBS_KEY}:{job_id}"
+
+
+def _dedup_key(dedup_key: str) -> str:
+    return f"{JOBS_KEY}:dedup:{dedup_key}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    dedup_key: str
+    run: JobRunner
+    total: Optional[int] = None
+    summary: Dict[str, Any] = field(default_factory=new_summary)
+
+    def progress(self) -> Dict[str, Any]:
+        progress = {key: value for key, value in self.summary.items() if key != "failed"}
+        progress["failed"] = len(self.summary.get("failed", []))
+        progress["total"] = self.total
+        return progress
+
+
+def _snapshot(job_id: str, record: Dict[str, str]) -> Dict[str, Any]:
+    status = record["status"]
+    error = record.get("error") or None
+    if status in ("queued", "running") and time.time() - float(record["heartbeat_at"]) > settings.job_lease_seconds:
+        # процесс, выполнявший задание, пропал, не записав результат
+        status, error = "failed", "lost: worker stopped reporting"
+    summary = record.get("summary")
+    return {
+        "job_id": job_id,
+        "kind": record["kind"],
+        "status": status,
+        "created_at": record["created_at"],
+        "started_at": record.get("started_at") or None,
+        "finished_at": record.get("finished_at") or None,
+        "progress": json.loads(record["progress"]),
+        "summary": json.loads(summary) if summary else None,
+        "error": error,
+    }
+
+
+class JobManager:
+    """
+    Очередь фоновых заданий с фиксированным числом воркеров. Пока задание
+    с тем же dedup_key ждёт или выполняется (на любой реплике), повторный
+    submit возвращает его же — ретраи клиентов не запускают ту же работу
+    второй раз. Прогресс раз в job_progress_interval_seconds пишется в Redis,
+    законченные задания хранятся job_ttl_seconds.
+    """
+
+    def __init__(self, workers: int, queue_size: int, ttl_seconds: float):
+        self._workers_count = max(workers, 1)
+        self._queue_size = max(queue_size, 1)
+        self._ttl_seconds = int(ttl_seconds)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._reporter: Optional[asyncio.Task] = None
+        # незаконченные задания этого процесса
+        self._jobs: Dict[str, Job] = {}
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._workers_count)]
+        self._reporter = asyncio.create_task(self._report_forever())
+
+    async def stop(self) -> None:
+        tasks = [*self._workers, *([self._reporter] if self._reporter else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._reporter = None
+        self._queue = None
+        for job in list(self._jobs.values()):
+            await self._finish(job, "failed", "service shutting down")
+
+    async def submit(
+        self, kind: str, dedup_key: str, run: JobRunner, total: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Возвращает (снимок задания, deduplicated)."""
+        self.start()
+        job = Job(id=uuid.uuid4().hex, kind=kind, dedup_key=dedup_key, run=run, total=total)
+        lock_key = _dedup_key(dedup_key)
+        lease = int(settings.job_lease_seconds)
+        while not await redis_client.set(lock_key, job.id, nx=True, ex=lease):
+            existing_id = await redis_client.get(lock_key)
+            if existing_id is None:
+                # ключ истёк между SET и GET — пробуем занять снова
+                continue
+            existing = await self.get(existing_id)
+            if existing is not None and existing["status"] in ("queued", "running"):
+                return existing, True
+            # прежнее задание закончилось или потеряно: забираем ключ, только
+            # если его не успел забрать параллельный submit, иначе смотрим на его задание
+            if await _REPLACE_SCRIPT(keys=[lock_key], args=[existing_id, job.id, lease]):
+                break
+
+        await self._update(job, kind=kind, status="queued", created_at=_now())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull as exc:
+            await redis_client.delete(_job_key(job.id))
+            await _RELEASE_SCRIPT(keys=[lock_key], args=[job.id])
+            raise JobQueueFull(f"job queue is full ({self._queue_size})") from exc
+        self._jobs[job.id] = job
+        return await self.get(job.id), False
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = await redis_client.hgetall(_job_key(job_id))
+        return _snapshot(job_id, record) if record else None
+
+    async def _update(self, job: Job, **fields: Any) -> None:
+        key = _job_key(job.id)
+        fields["progress"] = json.dumps(job.progress(), default=str)
+        fields["heartbeat_at"] = time.time()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, self._ttl_seconds)
+        await pipe.execute()
+
+    async def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        self._jobs.pop(job.id, None)
+        try:
+            await self._update(
+                job,
+                status=status,
+                error=error or "",
+                finished_at=_now(),
+                summary=json.dumps(job.summary, default=str),
+            )
+            await _RELEASE_SCRIPT(keys=[_dedup_key(job.dedup_key)], args=[job.id])
+        except RedisError as exc:
+            # без записи в Redis задание станет lost, когда истечёт аренда
+            logger.warning("Could not store result of job %s: %s", job.id, exc)
+
+    async def _report_forever(self) -> None:
+        """Прогресс заданий этого процесса и продление их аренды."""
+        while True:
+            await asyncio.sleep(settings.job_progress_interval_seconds)
+            jobs = list(self._jobs.values())
+            if not jobs:
+                continue
+            pipe = redis_client.pipeline(transaction=False)
+            for job in jobs:
+                pipe.hset(
+                    _job_key(job.id),
+                    mapping={"progress": json.dumps(job.progress(), default=str), "heartbeat_at": time.time()},
+                )
+                pipe.expire(_job_key(job.id), self._ttl_seconds)
+                pipe.expire(_dedup_key(job.dedup_key), int(settings.job_lease_seconds))
+            try:
+                await pipe.execute()
+            except RedisError as exc:
+                logger.warning("Could not report job progress: %s", exc)
+
+    async def _worker(self) -> None:
+        while True:
+            job: Job = await self._queue.get()
+            try:
+                await self._update(job, status="running", started_at=_now())
+                job.summary = await job.run(job.summary)
+            except asyncio.CancelledError:
+                # stop() допишет его как failed
+                raise
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                await self._finish(job, "failed", str(exc))
+            else:
+                await self._finish(job, "done")
+            finally:
+                self._queue.task_done()
+
+
+job_manager = JobManager(
+    workers=settings.job_workers,
+    queue_size=settings.job_queue_size,
+    ttl_seconds=settings.job_ttl_seconds,
+)
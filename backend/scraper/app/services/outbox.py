@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.core import outbox
+from app.schemas.event import ScrapedEvent
+from app.services.forwarder import forward_events_to_catalog
+
+logger = logging.getLogger(__name__)
+
+
+async def _retry_entry(entry: dict) -> None:
+    events = []
+    invalid = []
+    for item in entry["events"]:
+        try:
+            events.append(ScrapedEvent.model_validate(item))
+        except ValidationError:
+            invalid.append(item)
+    if invalid:
+        # битое событие не станет валидным от повтора — не держим из-за него остальные
+        logger.warning("Outbox entry %s: %d invalid events dead-lettered", entry["id"], len(invalid))
+        await outbox.enqueue(invalid, attempts=settings.outbox_max_attempts, last_error="invalid event")
+
+    summary = await forward_events_to_catalog(events, retry_attempts=entry["attempts"])
+    await outbox.ack(entry["id"])
+    logger.info(
+        "Outbox entry %s retried (attempt %d): sent=%d updated=%d failed=%d",
+        entry["id"],
+        entry["attempts"] + 1,
+        summary["sent"],
+        summary["updated"],
+        len(summary["failed"]),
+    )
+
+
+async def drain_outbox_once() -> int:
+    """
+    Повторяем отправку созревших записей outbox. Снова упавшие события
+    forwarder сам положит обратно с attempts + 1 (или в dead-letter).
+    Невалидные события и записи, на которых повтор падает, уходят
+    в dead-letter, чтобы не перезабираться после каждой аренды.
+    """
+    entries = await outbox.claim_due(settings.outbox_drain_batch)
+    for entry in entries:
+        try:
+            await _retry_entry(entry)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Outbox entry %s failed, moving it to dead-letter", entry["id"])
+            await outbox.bury(entry["id"], entry["events"], entry["attempts"], repr(exc))
+    return len(entries)
+
+
+async def run_outbox_drainer() -> None:
+    interval = max(settings.outbox_drain_interval_seconds, 1)
+    while True:
+        try:
+            # после восстановления scraperCatalog выгребаем всё созревшее подряд
+            while await drain_outbox_once():
+                pass
+        except Exception:  # noqa: BLE001
+            logger.exception("Outbox drain failed")
+        await asyncio.sleep(interval)
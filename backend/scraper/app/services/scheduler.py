@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.core.collector import SOURCES, ScrapeSource
+from app.services.forwarder import forward_event_stream
+from app.services.sharding import coordinator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SourceStats:
+    runs: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    running: int = 0
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_seconds: Optional[float] = None
+    last_summary: Optional[Dict[str, int]] = None
+    next_run_at: Optional[datetime] = None
+
+
+class ScrapeScheduler:
+    """
+    Запускает источники по их собственному расписанию. Каждый источник
+    занимает не больше своих max_concurrency слотов, а всего одновременно
+    идёт не больше max_concurrency скрапов на реплику. Медленный источник
+    не задерживает быстрые, а jitter разводит старты во времени.
+    Расписание ведётся для всех источников, но запускаются только те,
+    что по кольцу реплик принадлежат этой реплике. Источник, переехавший
+    к нам при смене состава реплик, запускается сразу, а не через интервал.
+    """
+
+    def __init__(self, sources: List[ScrapeSource], max_concurrency: int):
+        self._sources: Dict[str, ScrapeSource] = {source.name: source for source in sources}
+        self._stats: Dict[str, SourceStats] = {name: SourceStats() for name in self._sources}
+        self._due_at: Dict[str, float] = {}
+        self._slots = asyncio.Semaphore(max(max_concurrency, 1))
+        self._wakeup = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+        # источники, пропущенные из-за того, что ими владеет другая реплика
+        self._foreign: Set[str] = set()
+        coordinator.on_change(self._on_rebalance)
+
+    def _schedule(self, name: str, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        delay = max(delay, 0) + random.uniform(0, max(self._sources[name].jitter_seconds, 0))
+        self._due_at[name] = loop.time() + delay
+        self._stats[name].next_run_at = datetime.fromtimestamp(
+            datetime.now(timezone.utc).timestamp() + delay, tz=timezone.utc
+        )
+
+    def _is_due(self, name: str, now: float) -> bool:
+        source = self._sources[name]
+        return now >= self._due_at[name] and self._stats[name].running < max(source.max_concurrency, 1)
+
+    async def run_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        for name in self._sources:
+            self._schedule(name, 0)
+        try:
+            while True:
+                now = loop.time()
+                for name in self._sources:
+                    if self._is_due(name, now):
+                        self._start(name)
+
+                self._wakeup.clear()
+                pending = [at for name, at in self._due_at.items() if self._is_due(name, at)]
+                timeout = max(min(pending) - loop.time(), 0) if pending else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def _start(self, name: str) -> None:
+        source = self._sources[name]
+        if not coordinator.owns(name):
+            # источник сейчас у другой реплики; если он переедет к нам,
+            # _on_rebalance запустит его, не дожидаясь этого срока
+            self._foreign.add(name)
+            self._schedule(name, source.interval_seconds)
+            return
+        self._foreign.discard(name)
+        self._stats[name].running += 1
+        # следующий запуск планируем сразу: при max_concurrency > 1
+        # долгий скрап не мешает начать следующий по расписанию
+        self._schedule(name, source.interval_seconds)
+        task = asyncio.create_task(self._run(source))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _on_rebalance(self) -> None:
+        acquired = [name for name in self._foreign if coordinator.owns(name)]
+        for name in acquired:
+            self._foreign.discard(name)
+            self._schedule(name, 0)
+        if acquired:
+            logger.info("Sources moved to this replica: %s", ", ".join(sorted(acquired)))
+            self._wakeup.set()
+
+    async def _run(self, source: ScrapeSource) -> None:
+        stats = self._stats[source.name]
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._slots:
+                started = loop.time()
+                stats.last_started_at = datetime.now(timezone.utc)
+                try:
+                    summary = await asyncio.wait_for(
+                        forward_event_stream(source.collect()),
+                        timeout=source.timeout_seconds,
+                    )
+                except asyncio.TimeoutError:
+                    self._record_failure(source, "timeout", f"timed out after {source.timeout_seconds}s")
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("Scrape of source %s failed", source.name)
+                    self._record_failure(source, "failed", str(exc))
+                else:
+                    stats.last_status = "ok"
+                    stats.last_error = None
+                    stats.consecutive_failures = 0
+                    stats.last_summary = {
+                        "sent": summary["sent"],
+                        "updated": summary["updated"],
+                        "skipped": summary["skipped"],
+                        "failed": len(summary["failed"]),
+                    }
+                finally:
+                    stats.runs += 1
+                    stats.last_finished_at = datetime.now(timezone.utc)
+                    stats.last_duration_seconds = round(loop.time() - started, 3)
+        finally:
+            stats.running -= 1
+            self._wakeup.set()
+
+    def _record_failure(self, source: ScrapeSource, status: str, error: str) -> None:
+        stats = self._stats[source.name]
+        stats.last_status = status
+        stats.last_error = error
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        backoff = min(
+            source.backoff_base_seconds * 2 ** (stats.consecutive_failures - 1),
+            source.backoff_max_seconds,
+        )
+        # падающий источник повторяем по растущему backoff, а не по интервалу
+        self._schedule(source.name, backoff)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        result = []
+        for name, source in self._sources.items():
+            result.append(
+                {
+                    "name": name,
+                    "interval_seconds": source.interval_seconds,
+                    "timeout_seconds": source.timeout_seconds,
+                    "max_concurrency": source.max_concurrency,
+                    "owner": coordinator.owner(name),
+                    "owned": coordinator.owns(name),
+                    **asdict(self._stats[name]),
+                }
+            )
+        return result
+
+
+scheduler = ScrapeScheduler(SOURCES, max_concurrency=settings.scrape_max_concurrency)
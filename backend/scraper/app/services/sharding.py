@@ -0,0 +1,107 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.core import membership
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Консистентное хеширование: у каждой реплики virtual_nodes точек на
+    кольце, источник принадлежит первой точке по часовой стрелке. Когда
+    реплика приходит или уходит, переезжает только ~1/N источников.
+    """
+
+    def __init__(self, members: Sequence[str], virtual_nodes: int):
+        self.members = sorted(set(members))
+        self._points: List[Tuple[int, str]] = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(max(virtual_nodes, 1))
+        )
+        self._keys = [point for point, _ in self._points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class ShardCoordinator:
+    """
+    Держит heartbeat реплики в Redis и кольцо из живых реплик. Если Redis
+    недоступен, работаем по последнему известному составу; пока состав
+    неизвестен, реплика считает своими все источники — лучше дубль
+    (его отсечёт дедупликация), чем несобранный источник.
+    """
+
+    def __init__(self, replica_id: str, virtual_nodes: int):
+        self.replica_id = replica_id
+        self._virtual_nodes = virtual_nodes
+        self._ring = HashRing([], virtual_nodes)
+        self._listeners: List[Callable[[], None]] = []
+        self.rebalances = 0
+
+    def on_change(self, listener: Callable[[], None]) -> None:
+        """listener вызывается после каждой смены состава реплик."""
+        self._listeners.append(listener)
+
+    def owns(self, key: str) -> bool:
+        owner = self._ring.owner(key)
+        return owner is None or owner == self.replica_id
+
+    def owner(self, key: str) -> Optional[str]:
+        return self._ring.owner(key)
+
+    def _update(self, members: List[str]) -> bool:
+        if self.replica_id not in members:
+            members = [*members, self.replica_id]
+        if sorted(set(members)) == self._ring.members:
+            return False
+        logger.info("Scraper replicas changed: %s -> %s", self._ring.members, sorted(set(members)))
+        self._ring = HashRing(members, self._virtual_nodes)
+        self.rebalances += 1
+        for listener in self._listeners:
+            listener()
+        return True
+
+    async def refresh(self) -> bool:
+        """Один heartbeat; True, если состав реплик поменялся."""
+        return self._update(await membership.heartbeat(self.replica_id))
+
+    async def run_forever(self) -> None:
+        interval = max(settings.replica_heartbeat_seconds, 0.5)
+        try:
+            while True:
+                try:
+                    await self.refresh()
+                except RedisError as exc:
+                    logger.warning("Replica heartbeat failed: %s", exc)
+                await asyncio.sleep(interval)
+        finally:
+            try:
+                await membership.leave(self.replica_id)
+            except RedisError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "replica_id": self.replica_id,
+            "replicas": self._ring.members,
+            "rebalances": self.rebalances,
+        }
+
+
+coordinator = ShardCoordinator(settings.replica_id, settings.shard_virtual_nodes)
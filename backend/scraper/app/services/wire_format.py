@@ -0,0 +1,91 @@
+import gzip
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - без msgpack шлём JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - без zstd остаётся gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS_PATH = "/scraperCatalog/upload/formats"
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# маленькие пачки не сжимаем: заголовок gzip/zstd съест выигрыш
+_MIN_COMPRESS_BYTES = 1024
+
+# (content_type, content_encoding | None)
+WireFormat = Tuple[str, Optional[str]]
+_negotiated: Optional[WireFormat] = None
+_negotiated_at = 0.0
+
+
+def _pick_format(advertised: Dict[str, Any]) -> WireFormat:
+    content_types = advertised.get("content_types") or []
+    encodings = advertised.get("encodings") or []
+    content_type = MSGPACK if msgpack is not None and MSGPACK in content_types else JSON
+    encoding = None
+    if zstandard is not None and "zstd" in encodings:
+        encoding = "zstd"
+    elif "gzip" in encodings:
+        encoding = "gzip"
+    return content_type, encoding
+
+
+async def negotiate(client: httpx.AsyncClient) -> WireFormat:
+    """
+    Спрашиваем scraperCatalog, какие форматы он понимает, и кешируем ответ
+    на settings.wire_format_ttl_seconds. Старый каталог без /upload/formats
+    или FORWARD_WIRE_FORMAT=json — обычный JSON.
+    """
+    global _negotiated, _negotiated_at  # noqa: PLW0603
+    if settings.forward_wire_format == "json":
+        return JSON, None
+    if _negotiated is not None and time.monotonic() - _negotiated_at < settings.wire_format_ttl_seconds:
+        return _negotiated
+
+    try:
+        resp = await client.get(FORMATS_PATH)
+        advertised = resp.json() if resp.is_success else {}
+    except (httpx.HTTPError, ValueError) as exc:
+        logger.warning("Could not negotiate wire format, falling back to JSON: %s", exc)
+        advertised = {}
+
+    _negotiated = _pick_format(advertised if isinstance(advertised, dict) else {})
+    _negotiated_at = time.monotonic()
+    return _negotiated
+
+
+def reset_negotiation() -> None:
+    global _negotiated  # noqa: PLW0603
+    _negotiated = None
+
+
+def encode_body(body: Any, wire_format: WireFormat) -> Tuple[bytes, Dict[str, str]]:
+    content_type, encoding = wire_format
+    if content_type == MSGPACK:
+        content = msgpack.packb(body, use_bin_type=True)
+    else:
+        content = json.dumps(body, ensure_ascii=False).encode()
+
+    headers = {"Content-Type": content_type}
+    if encoding and len(content) >= _MIN_COMPRESS_BYTES:
+        if encoding == "zstd":
+            content = zstandard.ZstdCompressor(level=3).compress(content)
+        else:
+            content = gzip.compress(content, compresslevel=6)
+        headers["Content-Encoding"] = encoding
+    return content, headers
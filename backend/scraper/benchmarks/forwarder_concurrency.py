@@ -0,0 +1,132 @@
+"""
+Бенчмарк forward_events_to_catalog: время отправки против forward_concurrency.
+
+Поднимает локальный фейковый scraperCatalog (uvicorn на свободном порту),
+который отвечает на /scraperCatalog/upload/batch с задержкой, имитирующей
+скачивание картинок. Redis заменён in-memory множеством, чтобы мерить только
+пайплайн отправки.
+
+    cd backend/scraper
+    python benchmarks/forwarder_concurrency.py --events 2000 --latency 0.3
+"""
+import argparse
+import asyncio
+import socket
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.schemas.event import ScrapedEvent  # noqa: E402
+from app.services import forwarder  # noqa: E402
+from app.services.batch_sizer import AdaptiveBatchSizer  # noqa: E402
+
+
+def _fake_catalog(latency: float) -> FastAPI:
+    fake = FastAPI()
+
+    @fake.post("/scraperCatalog/upload/batch")
+    async def upload_batch(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        return {
+            "created": [{"uuid": item["uuid"], "type": item["type"]} for item in body["events"]],
+            "skipped": [],
+            "failed": [],
+        }
+
+    return fake
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _events(count: int) -> list:
+    return [
+        ScrapedEvent.model_validate(
+            {
+                "uuid": str(uuid.uuid4()),
+                "type": "concert",
+                "title": f"Bench concert {i}",
+                "description": "desc",
+                "price": 1000,
+                "date_preview": "2030-12-01T18:00:00",
+                "date_list": ["2030-12-02T19:00:00"],
+                "place": "Main stage",
+                "genre": "rock",
+                "age": "18+",
+                "image_url": "https://example.com/image.jpg",
+                "url": "https://example.com/event",
+            }
+        )
+        for i in range(count)
+    ]
+
+
+def _patch_redis() -> None:
+    fingerprints = {}
+
+    async def get_fingerprints(items):
+        return {str(event_id): fingerprints[str(event_id)] for event_id, _ in items if str(event_id) in fingerprints}
+
+    async def store_fingerprints(items):
+        fingerprints.update((str(event_id), fingerprint) for event_id, _, fingerprint in items)
+
+    async def enqueue(events, attempts, last_error):
+        return True
+
+    forwarder.get_fingerprints = get_fingerprints
+    forwarder.store_fingerprints = store_fingerprints
+    forwarder.outbox.enqueue = enqueue
+
+
+async def main(args) -> None:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(_fake_catalog(args.latency), port=port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    settings.scraper_catalog_service_url = f"http://127.0.0.1:{port}"
+    # размер пачки фиксируем, чтобы мерить только влияние concurrency
+    forwarder.batch_sizer = AdaptiveBatchSizer(
+        initial=args.batch_size,
+        min_size=args.batch_size,
+        max_size=args.batch_size,
+        target_latency=settings.batch_target_latency_seconds,
+        max_bytes=settings.batch_max_bytes,
+    )
+    _patch_redis()
+
+    print(f"events={args.events} batch_size={args.batch_size} latency={args.latency}s")
+    print(f"{'concurrency':>11} {'seconds':>8} {'events/s':>9} {'sent':>6}")
+    for concurrency in args.concurrency:
+        events = _events(args.events)
+        started = time.perf_counter()
+        summary = await forwarder.forward_events_to_catalog(events, concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+        assert summary["sent"] + summary["skipped"] + len(summary["failed"]) == len(events)
+        print(f"{concurrency:>11} {elapsed:>8.2f} {len(events) / elapsed:>9.0f} {summary['sent']:>6}")
+
+    server.should_exit = True
+    await serve_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка ответа на одну пачку, сек")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Бенчмарк формата тела upload/batch: байты на проводе и CPU на
+кодирование/декодирование для JSON и msgpack, без сжатия, с gzip и zstd.
+
+    cd backend/scraper
+    python benchmarks/wire_format.py --sizes 1000 10000
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+import msgpack  # noqa: E402
+import zstandard  # noqa: E402
+
+from app.schemas.event import ScrapedEvent  # noqa: E402
+from app.services.wire_format import JSON, MSGPACK, encode_body  # noqa: E402
+
+PLACES = ["Лайв концерт холл", "Main stage", "Крокус Сити Холл", "ВТБ Арена", "Театр на Таганке"]
+
+
+def _events(count: int) -> list:
+    return [
+        ScrapedEvent.model_validate(
+            {
+                "uuid": str(uuid.uuid4()),
+                "type": "concert",
+                "title": f"Концерт номер {i}",
+                "description": "Описание события, в реальных данных обычно несколько предложений.",
+                "price": 1000 + i % 5000,
+                "date_preview": "2030-12-01T18:00:00",
+                "date_list": ["2030-12-02T19:00:00", "2030-12-06T20:00:00"],
+                "place": PLACES[i % len(PLACES)],
+                "genre": "rock",
+                "age": "18+",
+                "image_url": f"https://avatars.mds.yandex.net/get-afishanew/4768735/{uuid.uuid4().hex}/s760x440",
+                "url": f"https://afisha.yandex.ru/moscow/concert/event-{i}",
+            }
+        ).to_catalog_payload()
+        for i in range(count)
+    ]
+
+
+def _decode(content: bytes, headers: dict):
+    encoding = headers.get("Content-Encoding")
+    if encoding == "gzip":
+        content = gzip.decompress(content)
+    elif encoding == "zstd":
+        content = zstandard.ZstdDecompressor().stream_reader(content).read()
+    if headers["Content-Type"] == MSGPACK:
+        return msgpack.unpackb(content, raw=False)
+    return json.loads(content)
+
+
+def _measure(body: dict, wire_format, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        content, headers = encode_body(body, wire_format)
+    encode_ms = (time.perf_counter() - started) / repeat * 1000
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decoded = _decode(content, headers)
+    decode_ms = (time.perf_counter() - started) / repeat * 1000
+    assert decoded == body
+    return len(content), encode_ms, decode_ms
+
+
+def main(args) -> None:
+    formats = [
+        (JSON, None),
+        (JSON, "gzip"),
+        (JSON, "zstd"),
+        (MSGPACK, None),
+        (MSGPACK, "gzip"),
+        (MSGPACK, "zstd"),
+    ]
+    for size in args.sizes:
+        body = {"events": _events(size)}
+        print(f"\n{size} events")
+        print(f"{'format':<24} {'bytes':>10} {'ratio':>6} {'encode ms':>10} {'decode ms':>10}")
+        baseline = None
+        for content_type, encoding in formats:
+            length, encode_ms, decode_ms = _measure(body, (content_type, encoding), args.repeat)
+            baseline = baseline or length
+            name = content_type.split("/")[1] + (f"+{encoding}" if encoding else "")
+            print(f"{name:<24} {length:>10} {length / baseline:>6.2f} {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+
+from app.schemas.event import ScrapedEvent
+
+
+def _event(date_preview, date_list) -> ScrapedEvent:
+    return ScrapedEvent.model_validate(
+        {
+            "uuid": "11111111-1111-1111-1111-111111111111",
+            "type": "concert",
+            "title": "title",
+            "description": "desc",
+            "price": 100,
+            "date_preview": date_preview,
+            "date_list": date_list,
+            "place": "place",
+            "genre": "rock",
+            "image_url": "https://example.com/image.jpg",
+            "url": "https://example.com/event",
+        }
+    )
+
+
+def test_ends_at_mixes_naive_and_aware_dates():
+    event = _event("2026-12-01T18:00:00", ["2026-12-02T19:00:00+03:00", "2026-12-02T17:00:00"])
+
+    # 19:00+03:00 — это 16:00 UTC, а naive 17:00 считается UTC
+    assert event.ends_at() == datetime(2026, 12, 2, 17, 0, tzinfo=timezone.utc)
+
+
+def test_ends_at_keeps_offset_of_aware_dates():
+    event = _event("2026-12-01T18:00:00+05:00", [])
+
+    assert event.ends_at() == datetime(2026, 12, 1, 18, 0, tzinfo=timezone(timedelta(hours=5)))
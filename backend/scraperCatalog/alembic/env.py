@@ -36,6 +36,11 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def _create_extensions() -> None:
+    """pg_trgm нужен индексам gin_trgm_ops по title до того, как их создаст миграция."""
+    context.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
 def run_migrations_offline() -> None:
     """Запуск миграций в offline-режиме (без реального подключения)."""
     url = config.get_main_option("sqlalchemy.url")
@@ -47,6 +52,7 @@ def run_migrations_offline() -> None:
     )
 
     with context.begin_transaction():
+        _create_extensions()
         context.run_migrations()
 
 
@@ -59,6 +65,7 @@ def do_run_migrations(connection: Connection) -> None:
     )
 
     with context.begin_transaction():
+        _create_extensions()
         context.run_migrations()
 
 
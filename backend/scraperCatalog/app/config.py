@@ -16,5 +16,48 @@ class Settings(BaseModel):
     s3_region: str = os.getenv("S3_REGION", "us-east-1")
     s3_base_url: str = os.getenv("S3_BASE_URL", "")
     s3_acl: str = os.getenv("S3_ACL", "public-read")
+    # предел тела upload/update после распаковки
+    upload_max_bytes: int = int(os.getenv("UPLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+    # split — active/inactive + типовые таблицы; single — одна таблица events
+    storage_mode: str = os.getenv("STORAGE_MODE", "split")
+    # размер страницы /events, /inactive-events и /best-events, когда передан
+    # ?cursor= без ?limit=; без limit и cursor эти ручки отдают весь список
+    list_page_size: int = int(os.getenv("LIST_PAGE_SIZE", "100"))
+    # ?stream=ndjson|json: сколько строк за раз тянем серверным курсором
+    stream_chunk_rows: int = int(os.getenv("STREAM_CHUNK_ROWS", "500"))
+    # upload/batch пишет новые события INSERT ... ON CONFLICT DO NOTHING пачками
+    # по ingest_chunk_size с коммитом после каждой; 0 — по одному через ORM
+    ingest_bulk: bool = os.getenv("INGEST_BULK", "1") == "1"
+    ingest_chunk_size: int = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+    # истечение событий SQL-запросами по expiry_chunk_size строк на транзакцию;
+    # 0 — старый обход всех активных событий в Python
+    expiry_sql: bool = os.getenv("EXPIRY_SQL", "1") == "1"
+    expiry_chunk_size: int = int(os.getenv("EXPIRY_CHUNK_SIZE", "1000"))
+    # планировщик истечения спит до ближайшего срока, но не меньше min и не
+    # больше max (max ловит события, загруженные за время сна); проход делает
+    # тот процесс, кто взял advisory lock expiry_lock_key
+    expiry_min_sleep_seconds: float = float(os.getenv("EXPIRY_MIN_SLEEP_SECONDS", "2"))
+    expiry_max_sleep_seconds: float = float(os.getenv("EXPIRY_MAX_SLEEP_SECONDS", "300"))
+    expiry_lock_key: int = int(os.getenv("EXPIRY_LOCK_KEY", "7301"))
+    # картинки: всего одновременно и не больше image_host_concurrency на один CDN
+    image_concurrency: int = int(os.getenv("IMAGE_CONCURRENCY", "16"))
+    image_host_concurrency: int = int(os.getenv("IMAGE_HOST_CONCURRENCY", "4"))
+    # перекодирование в WebP: процессы и пределы на входную картинку
+    image_transcode_workers: int = int(os.getenv("IMAGE_TRANSCODE_WORKERS", str(os.cpu_count() or 2)))
+    image_max_bytes: int = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+    image_max_pixels: int = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+    image_webp_quality: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    # как часто перепроверять уже загруженную картинку по её URL (условным GET)
+    image_recheck_seconds: int = int(os.getenv("IMAGE_RECHECK_SECONDS", str(24 * 3600)))
+    # inline — картинка качается во время upload; deferred — событие сохраняется
+    # сразу с image_status=pending, картинку доделывают воркеры из image_jobs
+    image_mode: str = os.getenv("IMAGE_MODE", "inline")
+    image_workers: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    image_job_batch: int = int(os.getenv("IMAGE_JOB_BATCH", "20"))
+    image_job_poll_seconds: float = float(os.getenv("IMAGE_JOB_POLL_SECONDS", "2"))
+    image_job_lease_seconds: int = int(os.getenv("IMAGE_JOB_LEASE_SECONDS", "300"))
+    image_job_max_attempts: int = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "8"))
+    image_job_backoff_base_seconds: int = int(os.getenv("IMAGE_JOB_BACKOFF_BASE_SECONDS", "30"))
+    image_job_backoff_max_seconds: int = int(os.getenv("IMAGE_JOB_BACKOFF_MAX_SECONDS", "3600"))
 
 settings = Settings()
@@ -6,4 +6,4 @@ class Base(DeclarativeBase):
 
 
 # Импортируем модели, чтобы они «подвесились» на Base.metadata
-from app.models import event  # noqa: F401
\ No newline at end of file
+from app.models import event, image  # noqa: F401
\ No newline at end of file
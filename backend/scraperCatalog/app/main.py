@@ -2,8 +2,14 @@ import asyncio
 import logging
 
 from fastapi import FastAPI
+
+from app.config import settings
 from app.db.session import AsyncSessionLocal
-from app.services.check_active_events import move_expired_events
+from app.services.expiry_scheduler import run_expiry_scheduler
+from app.services.image_downloader import close_image_clients, start_image_clients
+from app.services.image_jobs import deferred_images, run_image_worker
+from app.services.image_transcoder import shutdown_transcoder, start_transcoder
+from app.services.storage import backfill_events_table, single_table
 from app.routers import scraper, catalog
 
 app = FastAPI(
@@ -20,16 +26,55 @@ app.include_router(catalog.router)
 
 logger = logging.getLogger(__name__)
 
+# воркеры очереди картинок для режима deferred
+_image_workers: list[asyncio.Task] = []
+# планировщик истечения событий
+_expiry_tasks: list[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def prepare_storage():
+    if not single_table():
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await backfill_events_table(db)
+    except Exception as exc:  # noqa: BLE001 - без events сервис всё равно поднимаем
+        logger.warning("events backfill failed: %s", exc)
+
+
+@app.on_event("startup")
+async def open_image_clients():
+    await start_image_clients()
+    start_transcoder()
+    # в inline-режиме очередь никто не пополняет — воркеры не нужны
+    if deferred_images() and not _image_workers:
+        _image_workers.extend(
+            asyncio.create_task(run_image_worker()) for _ in range(max(settings.image_workers, 0))
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_image_clients():
+    for task in _image_workers:
+        task.cancel()
+    await asyncio.gather(*_image_workers, return_exceptions=True)
+    _image_workers.clear()
+    await close_image_clients()
+    shutdown_transcoder()
+
 
 @app.on_event("startup")
 async def schedule_expired_cleanup():
-    async def worker():
-        while True:
-            try:
-                async with AsyncSessionLocal() as db:
-                    await asyncio.sleep(30)
-                    await move_expired_events(db)
-            except Exception as exc:  # не дать задаче упасть навсегда
-                logger.warning("move_expired_events failed: %s", exc)
-            await asyncio.sleep(3570) 
-    asyncio.create_task(worker())
+    # просыпается к ближайшему сроку события; проход делает один процесс
+    # на все реплики (advisory lock)
+    if not _expiry_tasks:
+        _expiry_tasks.append(asyncio.create_task(run_expiry_scheduler()))
+
+
+@app.on_event("shutdown")
+async def stop_expired_cleanup():
+    for task in _expiry_tasks:
+        task.cancel()
+    await asyncio.gather(*_expiry_tasks, return_exceptions=True)
+    _expiry_tasks.clear()
@@ -1,8 +1,22 @@
 from datetime import datetime
 import uuid
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import mapped_column
 
 from app.db.base import Base
 
@@ -24,19 +38,66 @@ class EventMixin:
     genre = Column(String, nullable=False)
     age = Column(String, nullable=True)
     image_url = Column(String, nullable=False)
+    # ссылки на WebP-варианты: {"full": ..., "card": ..., "thumbnail": ...}
+    image_variants = Column(JSONB(none_as_null=True), nullable=True)
+    # ready — image_url указывает на наш S3; pending/failed — пока ссылка источника
+    image_status = Column(String, nullable=False, default="ready", server_default="ready")
     url = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # ближайшая ещё не прошедшая дата и последняя дата события (naive UTC):
+    # пишутся при загрузке, next пересчитывает воркер истечения
+    next_occurrence_at = Column(DateTime, nullable=True, index=True)
+    last_occurrence_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+# Конфигурация полнотекстового поиска; to_tsvector с явной конфигурацией
+# immutable, поэтому годится для GENERATED-колонки.
+SEARCH_CONFIG = "russian"
+
+
+class SearchMixin:
+    """
+    Поиск по активным событиям: взвешенный tsvector (title > genre > place
+    > description), который Postgres сам пересчитывает при записи строки.
+    deferred — списки событий его не тянут.
+    """
+
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(genre, '')), 'B') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(place, '')), 'C') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(description, '')), 'D')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
 
-class ActiveEvent(EventMixin, Base):
+class ActiveEvent(SearchMixin, EventMixin, Base):
     __tablename__ = "active_events"
     __table_args__ = (
         UniqueConstraint("uuid", name="uq_active_events_uuid"),
+        # лента /uuids идёт по (created_at, uuid)
+        Index("ix_active_events_created_uuid", "created_at", "uuid"),
+        Index("ix_active_events_type_next_occurrence", "event_type", "next_occurrence_at"),
+        # планировщик истечения: min(date_preview) — когда пора будить воркер
+        Index("ix_active_events_date_preview", "date_preview"),
+        Index("ix_active_events_search", "search_vector", postgresql_using="gin"),
+        # опечатки: title <% запрос через pg_trgm
+        Index(
+            "ix_active_events_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
     )
 
 class InactiveEvent(EventMixin, Base):
     __tablename__ = "inactive_events"
     __table_args__ = (
         UniqueConstraint("uuid", name="uq_inactive_events_uuid"),
+        Index("ix_inactive_events_created_uuid", "created_at", "uuid"),
     )
 
 
@@ -44,6 +105,7 @@ class BestEvents(EventMixin, Base):
     __tablename__ = "best_events"
     __table_args__ = (
         UniqueConstraint("uuid", name="uq_best_events_uuid"),
+        Index("ix_best_events_created_uuid", "created_at", "uuid"),
     )
 
 
@@ -116,3 +178,43 @@ class MasterClassEvent(EventMixin, Base):
         UniqueConstraint("uuid", name="uq_master_class_events_uuid"),
     )
 
+
+class Event(SearchMixin, EventMixin, Base):
+    """
+    Единая таблица событий для STORAGE_MODE=single: вместо active/inactive
+    и десяти типовых таблиц — флаг is_active и частичные индексы под
+    выборки по типу. Уход в архив — смена флага, а не перенос строки.
+    """
+
+    __tablename__ = "events"
+    __table_args__ = (
+        UniqueConstraint("uuid", name="uq_events_uuid"),
+        Index("ix_events_created_uuid", "created_at", "uuid"),
+        Index("ix_events_active_type", "event_type", "id", postgresql_where=text("is_active")),
+        Index("ix_events_active_id", "id", postgresql_where=text("is_active")),
+        Index("ix_events_inactive_created", "created_at", postgresql_where=text("NOT is_active")),
+        Index("ix_events_inactive_id", "id", postgresql_where=text("NOT is_active")),
+        Index("ix_events_active_next_occurrence", "next_occurrence_at", postgresql_where=text("is_active")),
+        Index("ix_events_active_date_preview", "date_preview", postgresql_where=text("is_active")),
+        Index(
+            "ix_events_active_type_next_occurrence",
+            "event_type",
+            "next_occurrence_at",
+            postgresql_where=text("is_active"),
+        ),
+        Index("ix_events_active_search", "search_vector", postgresql_using="gin", postgresql_where=text("is_active")),
+        Index(
+            "ix_events_active_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+            postgresql_where=text("is_active"),
+        ),
+    )
+
+    is_active = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+
+
+# gin_trgm_ops нужен pg_trgm; миграции ставят его в alembic/env.py,
+# а это — для create_all (бенчмарки)
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
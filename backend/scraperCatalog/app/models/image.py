@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.db.base import Base
+
+
+class ImageObject(Base):
+    """
+    Уже загруженная в S3 картинка: исходный URL -> хеш исходных байт ->
+    ключи WebP-вариантов. Ключи адресуются хешем, поэтому одинаковые
+    картинки с разных URL лежат в S3 один раз.
+    """
+
+    __tablename__ = "image_objects"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_url = Column(String, nullable=False, unique=True)
+    content_hash = Column(String(64), nullable=False, index=True)
+    # {"full": key, "card": key, "thumbnail": key}
+    object_keys = Column(JSONB, nullable=False)
+    # валидаторы источника для условного GET при перепроверке
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    checked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ImageJob(Base):
+    """
+    Очередь картинок для режима IMAGE_MODE=deferred: строка добавляется
+    в той же транзакции, что и событие, и забирается воркерами через
+    SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    __tablename__ = "image_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_uuid = Column(UUID(as_uuid=True), nullable=False, unique=True)
+    source_url = Column(String, nullable=False)
+    # pending -> processing -> (строка удаляется) | failed
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # для pending — когда пробовать, для processing — до когда действует аренда
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
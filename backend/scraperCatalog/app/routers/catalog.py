@@ -1,11 +1,18 @@
-from typing import List
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Literal, Union
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Path, Query, Body
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, case, literal_column, or_, select, tuple_, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
+from app.config import settings
 from app.db.session import get_db
-from app.schemas.event import EventRead
+from app.schemas.event import EventPage, EventRead, EventUuidPage, EventUuidRead
 from app.models.event import (
     ActiveEvent,
     InactiveEvent,
@@ -19,8 +26,12 @@ from app.models.event import (
     SportEvent,
     StandUpEvent,
     TheaterEvent,
-    BestEvents
+    BestEvents,
+    Event,
 )
+from app.services.event_stream import StreamFormat, stream_events
+from app.services.search import search_events
+from app.services.storage import active_events, active_model, inactive_events, single_table
 
 router = APIRouter(prefix="/scraperCatalog", tags=["catalog"])
 
@@ -38,36 +49,185 @@ TYPE_MODEL_MAP = {
     "master_class": MasterClassEvent,
 }
 
-@router.get("/events", response_model=List[EventRead])
+ListOrder = Literal["id", "next"]
+
+
+@dataclass
+class PageQuery:
+    limit: int
+    cursor: str | None
+    order: ListOrder
+    legacy: bool
+    stream: StreamFormat | None
+
+
+def page_query(
+    limit: int | None = Query(None, ge=1, le=1000, description="Page size, LIST_PAGE_SIZE by default"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    order: ListOrder = Query("id", description="id | next (by next_occurrence_at)"),
+    legacy: bool = Query(
+        False,
+        description=(
+            "Whole table as a plain list even if limit, cursor or stream are given; "
+            "without them the plain list is already the default"
+        ),
+    ),
+    stream: StreamFormat | None = Query(
+        None, description="Stream everything after cursor as ndjson or a json array, ignoring limit"
+    ),
+) -> PageQuery:
+    # страницы — только по запросу (limit или cursor): без них отдаём
+    # весь список, как до пагинации, чтобы не сломать старых клиентов
+    paged = limit is not None or cursor is not None
+    return PageQuery(
+        limit=limit or settings.list_page_size,
+        cursor=cursor,
+        order=order,
+        legacy=legacy or (not paged and stream is None),
+        stream=stream,
+    )
+
+
+def _encode_page_cursor(order: ListOrder, event) -> str:
+    next_at = event.next_occurrence_at.isoformat() if order == "next" and event.next_occurrence_at else ""
+    raw = f"{order}|{next_at}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_page_cursor(cursor: str, order: ListOrder) -> tuple[datetime | None, int]:
+    try:
+        cursor_order, next_at, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if cursor_order != order:
+            raise ValueError("cursor was issued for another order")
+        return (datetime.fromisoformat(next_at) if next_at else None), int(event_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
+
+
+def _after_cursor(model, order: ListOrder, cursor: str):
+    next_at, last_id = _decode_page_cursor(cursor, order)
+    if order == "id":
+        return model.id > last_id
+    # NULLS LAST: после последнего датированного события идут недатированные
+    if next_at is None:
+        return and_(model.next_occurrence_at.is_(None), model.id > last_id)
+    return or_(
+        model.next_occurrence_at > next_at,
+        and_(model.next_occurrence_at == next_at, model.id > last_id),
+        model.next_occurrence_at.is_(None),
+    )
+
+
+async def _list_page(
+    db: AsyncSession, query: Select, model, page: PageQuery
+) -> Union[EventPage, List[EventRead], StreamingResponse]:
+    """
+    Keyset-страница: WHERE (ключ) > курсор ORDER BY ключ LIMIT n+1 —
+    стоимость страницы не зависит от её номера и размера таблицы.
+    legacy (и запрос без limit/cursor/stream) — вся выборка списком,
+    как было до пагинации; stream — всё после курсора потоком, без limit.
+    """
+    if page.legacy:
+        events = (await db.execute(query)).scalars().all()
+        return [EventRead.model_validate(event) for event in events]
+
+    if page.order == "next":
+        query = query.order_by(model.next_occurrence_at.asc().nulls_last(), model.id)
+    else:
+        query = query.order_by(model.id)
+    if page.cursor:
+        query = query.where(_after_cursor(model, page.order, page.cursor))
+    if page.stream:
+        return stream_events(query, model, page.stream)
+
+    events = (await db.execute(query.limit(page.limit + 1))).scalars().all()
+    next_cursor = _encode_page_cursor(page.order, events[page.limit - 1]) if len(events) > page.limit else None
+    return EventPage(
+        items=[EventRead.model_validate(event) for event in events[:page.limit]],
+        next_cursor=next_cursor,
+    )
+
+
+def _page_items(response: Union[EventPage, List[EventRead]]) -> List[EventRead]:
+    return response if isinstance(response, list) else response.items
+
+
+@router.get("/events", response_model=Union[EventPage, List[EventRead]])
 async def list_active_events(
     event_id: int | None = Query(None, alias="id", description="Event ID"),
     event_type: str | None = Query(None, alias="type", description="Event type"),
+    page: PageQuery = Depends(page_query),
     db: AsyncSession = Depends(get_db),
 ):
-    model = ActiveEvent
+    model = active_model()
+    query = active_events()
     if event_type is not None:
         normalized = event_type.lower()
-        model = TYPE_MODEL_MAP.get(normalized)
-        if model is None:
+        type_model = TYPE_MODEL_MAP.get(normalized)
+        if type_model is None:
             raise HTTPException(status_code=404, detail="unsupported event type")
+        if single_table():
+            query = query.where(Event.event_type == normalized)
+        else:
+            model = type_model
+            query = select(model)
 
-    query = select(model)
     if event_id is not None:
         query = query.where(model.id == event_id)
+        # одно событие по id потоком не отдаём
+        page.stream = None
 
-    result = await db.execute(query)
-    events = result.scalars().all()
+    response = await _list_page(db, query, model, page)
 
-    if event_id is not None and not events:
+    if event_id is not None and not _page_items(response):
         raise HTTPException(status_code=404, detail="event not found")
 
-    return [EventRead.model_validate(event) for event in events]
+    return response
 
-@router.get("/inactive-events", response_model=List[EventRead])
-async def list_inactive_events(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(InactiveEvent))
-    events = result.scalars().all()
-    return [EventRead.model_validate(event) for event in events]
+@router.get("/events/upcoming", response_model=List[EventRead])
+async def list_upcoming_events(
+    event_type: str | None = Query(None, alias="type", description="Event type"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Ближайшие активные события по next_occurrence_at: диапазон по индексу
+    (event_type, next_occurrence_at) и LIMIT, без разбора date_list.
+    """
+    model = active_model()
+    query = active_events().where(model.next_occurrence_at > datetime.utcnow())
+    if event_type is not None:
+        normalized = event_type.lower()
+        if normalized not in TYPE_MODEL_MAP:
+            raise HTTPException(status_code=404, detail="unsupported event type")
+        query = query.where(model.event_type == normalized)
+
+    result = await db.execute(query.order_by(model.next_occurrence_at).limit(limit))
+    return [EventRead.model_validate(event) for event in result.scalars().all()]
+
+@router.get("/search", response_model=List[EventRead])
+async def search_active_events(
+    q: str = Query(..., min_length=2, max_length=200, description="Search query"),
+    event_type: str | None = Query(None, alias="type", description="Event type"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    normalized = None
+    if event_type is not None:
+        normalized = event_type.lower()
+        if normalized not in TYPE_MODEL_MAP:
+            raise HTTPException(status_code=404, detail="unsupported event type")
+
+    result = await db.execute(search_events(q.strip(), normalized, limit))
+    return [EventRead.model_validate(event) for event in result.scalars().all()]
+
+@router.get("/inactive-events", response_model=Union[EventPage, List[EventRead]])
+async def list_inactive_events(
+    page: PageQuery = Depends(page_query),
+    db: AsyncSession = Depends(get_db),
+):
+    model = Event if single_table() else InactiveEvent
+    return await _list_page(db, inactive_events(), model, page)
 
 @router.post("/events/post-best")
 async def post_best_events(
@@ -78,7 +238,7 @@ async def post_best_events(
     if not event_ids:
         raise HTTPException(status_code=400, detail="ids cannot be empty")
 
-    result = await db.execute(select(ActiveEvent).where(ActiveEvent.id.in_(event_ids)))
+    result = await db.execute(active_events().where(active_model().id.in_(event_ids)))
     events = result.scalars().all()
 
     if not events:
@@ -109,7 +269,10 @@ async def post_best_events(
             genre=event.genre,
             age=event.age,
             image_url=event.image_url,
+            image_variants=event.image_variants,
             url=event.url,
+            next_occurrence_at=event.next_occurrence_at,
+            last_occurrence_at=event.last_occurrence_at,
         )
 
         db.add(best_event)
@@ -130,10 +293,11 @@ async def post_best_events(
         "not_found_ids": not_found_ids,
     }
 
-@router.get("/best-events", response_model=List[EventRead])
+@router.get("/best-events", response_model=Union[EventPage, List[EventRead]])
 async def list_best_events(
     event_type: str | None = Query(None, alias="type", description="Event type"),
     event_id: int | None = Query(None, alias="id", description="Event ID"),
+    page: PageQuery = Depends(page_query),
     db: AsyncSession = Depends(get_db)
     ):
 
@@ -148,11 +312,74 @@ async def list_best_events(
 
     if event_id is not None:
         query = query.where(BestEvents.id == event_id)
+        page.stream = None
     
-    result = await db.execute(query)
-    events = result.scalars().all() 
+    response = await _list_page(db, query, BestEvents, page)
 
-    if event_id is not None and not events:
+    if event_id is not None and not _page_items(response):
         raise HTTPException(status_code=404, detail="event not found")
     
-    return [EventRead.model_validate(event) for event in events]
\ No newline at end of file
+    return response
+
+
+def _encode_uuid_cursor(created_at: datetime, event_uuid: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{event_uuid}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_uuid_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, event_uuid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(event_uuid)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
+
+
+@router.get("/uuids", response_model=EventUuidPage)
+async def list_event_uuids(
+    since: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(5000, ge=1, le=50000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Компактная лента uuid из active, inactive и best для прогрева
+    дедупликации в scraper. Идёт по (created_at, uuid), так что с
+    сохранённым курсором отдаёт только то, что появилось после него.
+    """
+    if single_table():
+        sources = [(Event, case((Event.is_active, "active"), else_="inactive")), (BestEvents, "best")]
+    else:
+        sources = [(ActiveEvent, "active"), (InactiveEvent, "inactive"), (BestEvents, "best")]
+    parts = [
+        select(
+            model.uuid.label("uuid"),
+            model.created_at.label("created_at"),
+            model.date_preview.label("date_preview"),
+            model.date_list.label("date_list"),
+            (literal_column(f"'{state}'") if isinstance(state, str) else state).label("state"),
+        )
+        for model, state in sources
+    ]
+    feed = union_all(*parts).subquery()
+
+    query = select(feed).order_by(feed.c.created_at, feed.c.uuid).limit(limit)
+    if since:
+        created_at, event_uuid = _decode_uuid_cursor(since)
+        query = query.where(tuple_(feed.c.created_at, feed.c.uuid) > tuple_(created_at, event_uuid))
+
+    rows = (await db.execute(query)).all()
+    items = [
+        EventUuidRead(
+            uuid=row.uuid,
+            state=row.state,
+            ends_at=max([*(row.date_list or []), row.date_preview]),
+        )
+        for row in rows
+    ]
+
+    # курсор отдаём и на последней странице: по нему scraper потом
+    # дочитывает только новое
+    next_cursor = since
+    if rows:
+        next_cursor = _encode_uuid_cursor(rows[-1].created_at, rows[-1].uuid)
+    return EventUuidPage(items=items, next_cursor=next_cursor)
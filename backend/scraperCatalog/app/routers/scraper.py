@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, exists, or_
+from typing import Awaitable, Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import any_, bindparam, delete, select, union, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.session import get_db
 from app.models.event import (
     CinemaEvent,
     ConcertEvent,
     ActiveEvent,
+    BestEvents,
     InactiveEvent,
     ExhibitionEvent,
     ExcursionEvent,
@@ -16,12 +24,26 @@ from app.models.event import (
     SportEvent,
     StandUpEvent,
     TheaterEvent,
+    Event,
+)
+from app.schemas.event import EventCreate, EventCreateBatch, EventUpdate, EventUpdateBatch
+from app.services.image_downloader import (
+    ImageDownloadError,
+    cancel_prefetched,
+    download_image_variants,
+    prefetch_images,
 )
-from app.schemas.event import EventCreate, EventCreateBatch
-from app.services.image_downloader import ImageDownloadError, download_image
+from app.services import image_jobs
+from app.services.bulk_ingest import insert_events
+from app.services.check_active_events import occurrence_bounds
+from app.services.storage import active_events, active_model, single_table
+from app.services.image_jobs import deferred_images
+from app.services.wire_format import JSON, MSGPACK, decode_request_body, supported_formats
 
 router = APIRouter(prefix="/scraperCatalog", tags=["scraper"])
 
+ImageMode = Literal["inline", "deferred"]
+
 # Какие типы отправляем в какие таблицы
 TYPE_MODEL_MAP = {
     "concert": ConcertEvent,
@@ -36,29 +58,95 @@ TYPE_MODEL_MAP = {
     "master_class": MasterClassEvent,
 }
 
-async def process_event(data: EventCreate, db: AsyncSession) -> dict:
+def _batch_body(schema: type[BaseModel]):
+    """
+    Тело пачки в JSON или msgpack, опционально сжатое gzip/zstd
+    (см. wire_format), валидируем той же pydantic-схемой.
+    """
+
+    async def dependency(request: Request) -> BaseModel:
+        payload = await decode_request_body(request)
+        try:
+            return schema.model_validate(payload)
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors()) from exc
+
+    return dependency
+
+
+def _batch_openapi(schema: type[BaseModel]) -> dict:
+    body_schema = schema.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {JSON: {"schema": body_schema}, MSGPACK: {"schema": body_schema}},
+        }
+    }
+
+
+@router.get("/image-jobs")
+async def image_jobs_stats():
+    """Сколько заданий картинок в очереди по статусам (pending, processing, failed)."""
+    return await image_jobs.stats()
+
+
+@router.get("/upload/formats")
+async def upload_formats():
+    """Какие форматы тела и сжатия понимают upload/batch и update/batch."""
+    return supported_formats()
+
+
+async def find_existing_uuids(uuids: list[UUID], models: set, db: AsyncSession) -> set[UUID]:
+    """
+    Какие uuid уже есть в active/inactive или в типовых таблицах —
+    одним запросом `uuid = ANY(:uuids)` на всю пачку.
+    """
+    if not uuids:
+        return set()
+    uuids_param = bindparam("uuids", value=list(uuids), type_=ARRAY(PG_UUID(as_uuid=True)))
+    if single_table():
+        tables = [Event]
+    else:
+        tables = [ActiveEvent, InactiveEvent, *sorted(models, key=lambda model: model.__tablename__)]
+    stmt = union(*(select(table.uuid).where(table.uuid == any_(uuids_param)) for table in tables))
+    return set((await db.scalars(stmt)).all())
+
+
+async def prepare_event(
+    data: EventCreate,
+    db: AsyncSession,
+    already_exists: bool | None = None,
+    image: Awaitable[dict[str, str]] | None = None,
+    deferred: bool = False,
+) -> dict:
+    """
+    Решаем судьбу события, ничего не записывая: status "new" несёт
+    values для строк active/типовой таблицы и model.
+    already_exists — результат find_existing_uuids для пачки;
+    без него (одиночный upload) проверяем сами. image — уже запущенная
+    загрузка картинки (prefetch_images), иначе качаем здесь.
+    deferred — не ждём картинку: событие сохраняется с image_status=pending
+    и ссылкой источника, картинку доделает воркер image_jobs.
+    """
     normalized_type = data.normalized_type()
     model = TYPE_MODEL_MAP.get(normalized_type)
     if model is None:
         return {"status": "skipped", "reason": "unsupported_type", "uuid": str(data.uuid), "type": data.event_type}
-    
-    stmt = select(
-        or_(
-            select(exists().where(ActiveEvent.uuid == data.uuid)).scalar_subquery(),
-            select(exists().where(InactiveEvent.uuid == data.uuid)).scalar_subquery(),
-            select(exists().where(model.uuid == data.uuid)).scalar_subquery(),
-        )
-    )
 
-    already_exists = bool(await db.scalar(stmt))
-    existing = await db.scalar(select(model).where(model.uuid == data.uuid))
-    if already_exists or existing:
+    if already_exists is None:
+        already_exists = data.uuid in await find_existing_uuids([data.uuid], {model}, db)
+    if already_exists:
         return {"status": "skipped", "reason": "already_exists", "uuid": str(data.uuid), "type": normalized_type}
     
+    image_variants = None
+    image_status = "ready"
     stored_image_url = None
-    if data.image_url:
+    if data.image_url and deferred:
+        stored_image_url = data.image_url
+        image_status = "pending"
+    elif data.image_url:
         try:
-            stored_image_url = await download_image(data.image_url, str(data.uuid))
+            image_variants = await (image or download_image_variants(data.image_url))
         except ImageDownloadError as exc:
             return {
                 "status": "failed",
@@ -67,57 +155,103 @@ async def process_event(data: EventCreate, db: AsyncSession) -> dict:
                 "uuid": str(data.uuid),
                 "type": normalized_type,
             }
-        
+        stored_image_url = image_variants["full"]
+
     if not stored_image_url:
         return {"status": "skipped", "reason": "no_image_url", "uuid": str(data.uuid), "type": normalized_type}
-    
-    common_event = ActiveEvent(
-        uuid=data.uuid,
-        source_id=data.source_id,
-        title=data.title,
-        description=data.description,
-        price=data.price,
-        date_preview=data.date_preview,
-        date_list=data.date_list,
-        place=data.place,
-        event_type=normalized_type,
-        genre=data.genre,
-        age=data.age,
-        image_url=stored_image_url,
-        url=data.url,
-    )
 
-    type_event = model(
-        uuid=data.uuid,
-        source_id=data.source_id,
-        title=data.title,
-        description=data.description,
-        price=data.price,
-        date_preview=data.date_preview,
-        date_list=data.date_list,
-        place=data.place,
-        event_type=normalized_type,
-        genre=data.genre,
-        age=data.age,
-        image_url=stored_image_url,
-        url=data.url,
-    )
+    values = {
+        "uuid": data.uuid,
+        "source_id": data.source_id,
+        "title": data.title,
+        "description": data.description,
+        "price": data.price,
+        "date_preview": data.date_preview,
+        "date_list": data.date_list,
+        "place": data.place,
+        "event_type": normalized_type,
+        "genre": data.genre,
+        "age": data.age,
+        "image_url": stored_image_url,
+        "image_variants": image_variants,
+        "image_status": image_status,
+        "url": data.url,
+        **occurrence_bounds(data.date_preview, data.date_list),
+    }
+    return {
+        "status": "new",
+        "uuid": str(data.uuid),
+        "type": normalized_type,
+        "model": model,
+        "values": values,
+        "image_source_url": data.image_url if deferred else None,
+    }
 
-    db.add(common_event)
-    db.add(type_event)
-    return {"status": "created", "uuid": str(data.uuid), "type": normalized_type}
-    
 
-@router.post("/upload/batch", status_code=status.HTTP_201_CREATED)
-async def upload_data_batch(data: EventCreateBatch, db: AsyncSession = Depends(get_db)):
+async def process_event(
+    data: EventCreate,
+    db: AsyncSession,
+    already_exists: bool | None = None,
+    image: Awaitable[dict[str, str]] | None = None,
+    deferred: bool = False,
+) -> dict:
+    """prepare_event + запись через ORM в текущую транзакцию."""
+    result = await prepare_event(data, db, already_exists=already_exists, image=image, deferred=deferred)
+    if result["status"] != "new":
+        return result
+
+    if result["image_source_url"]:
+        await image_jobs.enqueue(db, data.uuid, result["image_source_url"])
+    if single_table():
+        db.add(Event(**result["values"]))
+    else:
+        db.add(ActiveEvent(**result["values"]))
+        db.add(result["model"](**result["values"]))
+    return {"status": "created", "uuid": result["uuid"], "type": result["type"]}
+
+
+def _new_images(events: list[EventCreate], existing: set[UUID]) -> dict[str, str]:
+    """Картинки событий, которые будем создавать (первое вхождение uuid)."""
+    images = {}
+    for event in events:
+        if event.uuid in existing or not event.image_url or event.normalized_type() not in TYPE_MODEL_MAP:
+            continue
+        images.setdefault(str(event.uuid), event.image_url)
+    return images
+
+
+@router.post("/upload/batch", status_code=status.HTTP_201_CREATED, openapi_extra=_batch_openapi(EventCreateBatch))
+async def upload_data_batch(
+    data: EventCreateBatch = Depends(_batch_body(EventCreateBatch)),
+    image_mode: ImageMode | None = Query(None, description="inline | deferred, по умолчанию IMAGE_MODE"),
+    db: AsyncSession = Depends(get_db),
+):
     created_events = []
     skipped_events = []
     failed_events = []
 
+    models = {TYPE_MODEL_MAP.get(event.normalized_type()) for event in data.events} - {None}
+    seen = await find_existing_uuids([event.uuid for event in data.events], models, db)
+    deferred = deferred_images(image_mode)
+    images = {} if deferred else prefetch_images(_new_images(data.events, seen))
+
+    bulk = settings.ingest_bulk
+    prepared = []
     try:
         for event_data in data.events:
-            result = await process_event(event_data, db)
-            if result["status"] == "created":
+            # повтор uuid внутри пачки тоже считаем уже существующим
+            result = await (prepare_event if bulk else process_event)(
+                event_data,
+                db,
+                already_exists=event_data.uuid in seen,
+                image=images.pop(str(event_data.uuid), None),
+                deferred=deferred,
+            )
+            if result["status"] in ("new", "created"):
+                seen.add(event_data.uuid)
+            if result["status"] == "new":
+                prepared.append(result)
+            elif result["status"] == "created":
                 created_events.append({"uuid": result["uuid"], "type": result["type"]})
 
             elif result["status"] == "skipped":
@@ -133,18 +267,32 @@ async def upload_data_batch(data: EventCreateBatch, db: AsyncSession = Depends(g
                         "detail": result.get("detail"),
                     }
                 )
-        await db.commit()
+
+        if bulk:
+            # коммитит сам, кусками
+            created, skipped, failed = await insert_events(db, prepared, settings.ingest_chunk_size)
+            created_events.extend(created)
+            skipped_events.extend(skipped)
+            failed_events.extend(failed)
+        else:
+            await db.commit()
     except Exception as exc:  # noqa: BLE001
         await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="failed to process batch"
         ) from exc
+    finally:
+        await cancel_prefetched(images)
 
     return {"created": created_events, "skipped": skipped_events, "failed": failed_events}
 
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
-async def upload_data(data: EventCreate, db: AsyncSession = Depends(get_db)):
-    result = await process_event(data, db)
+async def upload_data(
+    data: EventCreate,
+    image_mode: ImageMode | None = Query(None, description="inline | deferred, по умолчанию IMAGE_MODE"),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await process_event(data, db, deferred=deferred_images(image_mode))
     if result["status"] == "created":
         try:
             await db.commit()
@@ -161,4 +309,138 @@ async def upload_data(data: EventCreate, db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"not created, {result['reason']}: {result.get('detail')}",
         )
-    
\ No newline at end of file
+
+
+async def apply_event_update(
+    data: EventUpdate,
+    current: ActiveEvent | Event | None,
+    db: AsyncSession,
+    image: Awaitable[dict[str, str]] | None = None,
+    deferred: bool = False,
+) -> dict:
+    normalized_type = data.normalized_type()
+    model = TYPE_MODEL_MAP.get(normalized_type)
+    if model is None:
+        return {"status": "skipped", "reason": "unsupported_type", "uuid": str(data.uuid), "type": data.event_type}
+    if current is None:
+        # событие уже ушло в inactive или ещё не создано — обновлять нечего
+        return {"status": "skipped", "reason": "not_found", "uuid": str(data.uuid), "type": normalized_type}
+
+    image_url = current.image_url
+    image_variants = current.image_variants
+    image_status = current.image_status
+    if data.refresh_image and data.image_url and deferred:
+        # пока воркер не обработает новую картинку, показываем старую
+        await image_jobs.enqueue(db, data.uuid, data.image_url)
+        image_status = "pending"
+    elif data.refresh_image and data.image_url:
+        try:
+            image_variants = await (image or download_image_variants(data.image_url))
+            image_url = image_variants["full"]
+            image_status = "ready"
+        except ImageDownloadError as exc:
+            return {
+                "status": "failed",
+                "reason": "image_download_failed",
+                "detail": str(exc),
+                "uuid": str(data.uuid),
+                "type": normalized_type,
+            }
+
+    values = {
+        "source_id": data.source_id,
+        "title": data.title,
+        "description": data.description,
+        "price": data.price,
+        "date_preview": data.date_preview,
+        "date_list": data.date_list,
+        "place": data.place,
+        "event_type": normalized_type,
+        "genre": data.genre,
+        "age": data.age,
+        "image_url": image_url,
+        "image_variants": image_variants,
+        "image_status": image_status,
+        "url": data.url,
+        **occurrence_bounds(data.date_preview, data.date_list),
+    }
+
+    previous_model = TYPE_MODEL_MAP.get(current.event_type)
+    for field, value in values.items():
+        setattr(current, field, value)
+
+    # в режиме single тип — просто колонка events, типовых таблиц нет
+    if not single_table() and previous_model is not model:
+        # тип сменился — переносим строку в другую типовую таблицу
+        if previous_model is not None:
+            await db.execute(delete(previous_model).where(previous_model.uuid == data.uuid))
+        # в новой типовой таблице могла остаться старая строка с этим uuid
+        await db.execute(
+            insert(model).values(uuid=data.uuid, **values).on_conflict_do_update(index_elements=["uuid"], set_=values)
+        )
+    elif not single_table():
+        await db.execute(update(model).where(model.uuid == data.uuid).values(**values))
+    await db.execute(update(BestEvents).where(BestEvents.uuid == data.uuid).values(**values))
+    return {"status": "updated", "uuid": str(data.uuid), "type": normalized_type}
+
+
+@router.post("/update/batch", openapi_extra=_batch_openapi(EventUpdateBatch))
+async def update_data_batch(
+    data: EventUpdateBatch = Depends(_batch_body(EventUpdateBatch)),
+    image_mode: ImageMode | None = Query(None, description="inline | deferred, по умолчанию IMAGE_MODE"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Обновляем уже загруженные события (цена, даты, картинка и т.д.).
+    scraper присылает сюда только события, у которых поменялся отпечаток.
+    """
+    updated_events = []
+    skipped_events = []
+    failed_events = []
+
+    uuids = [event.uuid for event in data.events]
+    result = await db.execute(active_events().where(active_model().uuid.in_(uuids)))
+    current_by_uuid = {event.uuid: event for event in result.scalars().all()}
+    deferred = deferred_images(image_mode)
+    images = {} if deferred else prefetch_images(
+        {
+            str(event.uuid): event.image_url
+            for event in data.events
+            if event.refresh_image and event.image_url and event.uuid in current_by_uuid
+        }
+    )
+
+    try:
+        for event_data in data.events:
+            result = await apply_event_update(
+                event_data,
+                current_by_uuid.get(event_data.uuid),
+                db,
+                image=images.pop(str(event_data.uuid), None),
+                deferred=deferred,
+            )
+            if result["status"] == "updated":
+                updated_events.append({"uuid": result["uuid"], "type": result["type"]})
+            elif result["status"] == "skipped":
+                skipped_events.append(
+                    {"uuid": result["uuid"], "type": result["type"], "reason": result["reason"]}
+                )
+            elif result["status"] == "failed":
+                failed_events.append(
+                    {
+                        "uuid": result["uuid"],
+                        "type": result["type"],
+                        "reason": result["reason"],
+                        "detail": result.get("detail"),
+                    }
+                )
+        await db.commit()
+    except Exception as exc:  # noqa: BLE001
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="failed to process update batch"
+        ) from exc
+    finally:
+        await cancel_prefetched(images)
+
+    return {"updated": updated_events, "skipped": skipped_events, "failed": failed_events}
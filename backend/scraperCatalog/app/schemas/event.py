@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import UUID
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
@@ -62,6 +62,15 @@ class EventCreateBatch(BaseModel):
     events: List[EventCreate]
 
 
+class EventUpdate(EventCreate):
+    # scraper выставляет, если у источника поменялся image_url
+    refresh_image: bool = False
+
+
+class EventUpdateBatch(BaseModel):
+    events: List[EventUpdate]
+
+
 class EventRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -78,5 +87,25 @@ class EventRead(BaseModel):
     genre: str
     age: Optional[str] = None
     image_url: str
+    image_variants: Optional[Dict[str, str]] = None
+    image_status: str = "ready"
     url: str
+    next_occurrence_at: Optional[datetime] = None
     created_at: datetime
+
+
+class EventPage(BaseModel):
+    items: List[EventRead]
+    # None — страница последняя
+    next_cursor: Optional[str] = None
+
+
+class EventUuidRead(BaseModel):
+    uuid: UUID
+    state: str
+    ends_at: Optional[datetime] = None
+
+
+class EventUuidPage(BaseModel):
+    items: List[EventUuidRead]
+    next_cursor: Optional[str] = None
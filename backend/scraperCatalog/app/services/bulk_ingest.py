@@ -0,0 +1,87 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.event import ActiveEvent, Event
+from app.services import image_jobs
+from app.services.storage import single_table
+
+logger = logging.getLogger(__name__)
+
+# предел asyncpg/Postgres на число параметров в одном запросе
+MAX_BIND_PARAMS = 32767
+
+
+async def _insert_chunk(db: AsyncSession, chunk: List[dict]) -> Set[str]:
+    single = single_table()
+    target = Event if single else ActiveEvent
+    stmt = (
+        insert(target)
+        .values([item["values"] for item in chunk])
+        .on_conflict_do_nothing(index_elements=["uuid"])
+        .returning(target.uuid)
+    )
+    inserted = {str(event_uuid) for event_uuid in (await db.scalars(stmt)).all()}
+
+    by_model: Dict[type, List[dict]] = defaultdict(list)
+    for item in chunk:
+        # в режиме single вторая запись в типовую таблицу не нужна
+        if item["uuid"] in inserted and not single:
+            by_model[item["model"]].append(item["values"])
+    for model, rows in by_model.items():
+        await db.execute(insert(model).values(rows).on_conflict_do_nothing(index_elements=["uuid"]))
+
+    await image_jobs.enqueue_many(
+        db,
+        [
+            (item["values"]["uuid"], item["image_source_url"])
+            for item in chunk
+            if item["uuid"] in inserted and item["image_source_url"]
+        ],
+    )
+    return inserted
+
+
+async def insert_events(
+    db: AsyncSession, prepared: List[dict], chunk_size: int
+) -> Tuple[List[dict], List[dict], List[dict]]:
+    """
+    Пишем подготовленные prepare_event события: на кусок — один INSERT в
+    active_events, по одному в каждую типовую таблицу и коммит (в режиме
+    single — один INSERT в events). Кто создан,
+    а кто уже был (гонка с параллельной загрузкой), знаем из RETURNING.
+    Ошибка куска откатывает только его. Кусок ограничен так, чтобы
+    многострочный INSERT уложился в MAX_BIND_PARAMS: на строку — параметр
+    на каждую колонку таблицы, включая заполняемые default.
+    Возвращает (created, skipped, failed).
+    """
+    created: List[dict] = []
+    skipped: List[dict] = []
+    failed: List[dict] = []
+    columns = len((Event if single_table() else ActiveEvent).__table__.columns)
+    chunk_size = min(max(chunk_size, 1), MAX_BIND_PARAMS // columns)
+
+    for start in range(0, len(prepared), chunk_size):
+        chunk = prepared[start:start + chunk_size]
+        try:
+            inserted = await _insert_chunk(db, chunk)
+            await db.commit()
+        except SQLAlchemyError as exc:
+            await db.rollback()
+            logger.warning("Bulk insert of %d events failed: %s", len(chunk), exc)
+            failed.extend(
+                {"uuid": item["uuid"], "type": item["type"], "reason": "db_error", "detail": str(exc)}
+                for item in chunk
+            )
+            continue
+
+        for item in chunk:
+            if item["uuid"] in inserted:
+                created.append({"uuid": item["uuid"], "type": item["type"]})
+            else:
+                skipped.append({"uuid": item["uuid"], "type": item["type"], "reason": "already_exists"})
+    return created, skipped, failed
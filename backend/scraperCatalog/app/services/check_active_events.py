@@ -1,12 +1,18 @@
+from collections import defaultdict
 from datetime import datetime, timezone
+from typing import Dict, List
 
-from sqlalchemy import delete, select
+from sqlalchemy import DateTime, Integer, and_, any_, bindparam, case, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.event import (
     ActiveEvent,
     CinemaEvent,
     ConcertEvent,
+    Event,
     ExhibitionEvent,
     ExcursionEvent,
     InactiveEvent,
@@ -17,6 +23,7 @@ from app.models.event import (
     StandUpEvent,
     TheaterEvent,
 )
+from app.services.storage import COPY_COLUMNS, single_table
 
 TYPE_MODEL_MAP = {
     "concert": ConcertEvent,
@@ -44,7 +51,7 @@ def _next_future_date(event, now: datetime) -> datetime | None:
 
 
 def _as_storage(dt: datetime | None) -> datetime | None:
-    return dt.replace(tzinfo=None) if dt and dt.tzinfo else dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt and dt.tzinfo else dt
 
 
 def _last_date(event) -> datetime | None:
@@ -55,55 +62,284 @@ def _last_date(event) -> datetime | None:
     return max(dates) if dates else None
 
 
+def occurrence_bounds(date_preview: datetime | None, date_list, now: datetime | None = None) -> dict:
+    """
+    next_occurrence_at и last_occurrence_at по датам события —
+    кладём в values вместе с самим событием.
+    """
+    now = now or datetime.now(timezone.utc)
+    dates = [d for d in (_to_aware(dt) for dt in [*(date_list or []), date_preview]) if d]
+    future = [d for d in dates if d > now]
+    return {
+        "next_occurrence_at": _as_storage(min(future)) if future else None,
+        "last_occurrence_at": _as_storage(max(dates)) if dates else None,
+    }
+
+
+def _refresh_bounds(ev, now: datetime) -> bool:
+    changed = False
+    for field, value in occurrence_bounds(ev.date_preview, ev.date_list, now).items():
+        if getattr(ev, field) != value:
+            setattr(ev, field, value)
+            changed = True
+    return changed
+
+
+async def _sync_type_event(db: AsyncSession, ev: ActiveEvent) -> None:
+    type_model = TYPE_MODEL_MAP.get(ev.event_type)
+    if type_model:
+        await db.execute(
+            update(type_model)
+            .where(type_model.uuid == ev.uuid)
+            .values(
+                date_preview=ev.date_preview,
+                next_occurrence_at=ev.next_occurrence_at,
+                last_occurrence_at=ev.last_occurrence_at,
+            )
+        )
+
+
+async def _expire_single_table(db: AsyncSession, now: datetime) -> int:
+    """Режим single: уход в архив — is_active=false, строка остаётся на месте."""
+    result = await db.execute(select(Event).where(Event.is_active))
+    expired = 0
+    updated = 0
+    for ev in result.scalars().all():
+        next_date = _next_future_date(ev, now)
+        current_preview = _to_aware(ev.date_preview)
+        if next_date and (not current_preview or current_preview <= now):
+            ev.date_preview = _as_storage(next_date)
+            updated += 1
+        updated += _refresh_bounds(ev, now)
+        if next_date:
+            continue
+
+        last_dt = _last_date(ev)
+        if last_dt and last_dt <= now:
+            ev.is_active = False
+            # как у переноса в inactive_events: строка снова попадает в ленту /uuids
+            ev.created_at = _as_storage(now)
+            expired += 1
+
+    if expired or updated:
+        await db.commit()
+    else:
+        await db.rollback()
+    return expired
+
+
+def _occurrences(model, with_preview: bool = False):
+    dates = func.array_append(model.date_list, model.date_preview) if with_preview else model.date_list
+    return func.unnest(dates).column_valued("occurrence")
+
+
+def _next_occurrence(model, now: datetime, with_preview: bool = False):
+    """Ближайшая будущая дата из date_list (и date_preview), посчитанная в SQL через unnest."""
+    occurrence = _occurrences(model, with_preview)
+    return select(func.min(occurrence)).where(occurrence > now).scalar_subquery()
+
+
+def _last_occurrence(model):
+    occurrence = _occurrences(model, with_preview=True)
+    return select(func.max(occurrence)).scalar_subquery()
+
+
+def _uuids_by_type(rows: List[Row]) -> Dict[str, list]:
+    grouped: Dict[str, list] = defaultdict(list)
+    for row in rows:
+        grouped[row.event_type].append(row.uuid)
+    return grouped
+
+
+def _uuids_param(uuids: list):
+    return any_(bindparam("uuids", value=uuids, type_=ARRAY(PG_UUID(as_uuid=True))))
+
+
+_NO_SYNC = {"synchronize_session": False}
+
+
+async def _refresh_occurrences(db: AsyncSession, model, in_chunk: tuple, now: datetime) -> None:
+    """
+    У событий, которые остаются активными, сдвигаем прошедший date_preview
+    на ближайшую дату из date_list и пересчитываем next/last_occurrence_at.
+    """
+    next_in_list = _next_occurrence(model, now)
+    next_at = _next_occurrence(model, now, with_preview=True)
+    refreshed = (
+        await db.execute(
+            update(model)
+            .where(*in_chunk, next_at.is_not(None))
+            .values(
+                date_preview=case(
+                    (and_(model.date_preview <= now, next_in_list.is_not(None)), next_in_list),
+                    else_=model.date_preview,
+                ),
+                next_occurrence_at=next_at,
+                last_occurrence_at=_last_occurrence(model),
+            )
+            .returning(model.uuid, model.event_type)
+            .execution_options(**_NO_SYNC)
+        )
+    ).all()
+    if single_table():
+        return
+    for event_type, uuids in _uuids_by_type(refreshed).items():
+        type_model = TYPE_MODEL_MAP.get(event_type)
+        if type_model:
+            await db.execute(
+                update(type_model)
+                .where(type_model.uuid == ActiveEvent.uuid, ActiveEvent.uuid == _uuids_param(uuids))
+                .values(
+                    date_preview=ActiveEvent.date_preview,
+                    next_occurrence_at=ActiveEvent.next_occurrence_at,
+                    last_occurrence_at=ActiveEvent.last_occurrence_at,
+                )
+                .execution_options(**_NO_SYNC)
+            )
+
+
+async def _move_to_inactive(db: AsyncSession, in_chunk: tuple, now: datetime) -> int:
+    expired_ids = (
+        await db.scalars(
+            select(ActiveEvent.id)
+            .where(*in_chunk, ActiveEvent.date_preview <= now, _next_occurrence(ActiveEvent, now).is_(None))
+            .with_for_update()
+        )
+    ).all()
+    if not expired_ids:
+        return 0
+
+    expired = ActiveEvent.id == any_(bindparam("expired_ids", value=list(expired_ids), type_=ARRAY(Integer)))
+    # created_at в архиве — время переноса, как и раньше: по нему идёт лента /uuids
+    columns = [
+        literal(now, DateTime).label(name) if name == "created_at" else getattr(ActiveEvent, name)
+        for name in COPY_COLUMNS
+    ]
+    await db.execute(
+        insert(InactiveEvent)
+        .from_select(COPY_COLUMNS, select(*columns).where(expired))
+        .on_conflict_do_nothing(index_elements=["uuid"])
+    )
+    removed = (
+        await db.execute(
+            delete(ActiveEvent)
+            .where(expired)
+            .returning(ActiveEvent.uuid, ActiveEvent.event_type)
+            .execution_options(**_NO_SYNC)
+        )
+    ).all()
+    for event_type, uuids in _uuids_by_type(removed).items():
+        type_model = TYPE_MODEL_MAP.get(event_type)
+        if type_model:
+            await db.execute(
+                delete(type_model).where(type_model.uuid == _uuids_param(uuids)).execution_options(**_NO_SYNC)
+            )
+    return len(removed)
+
+
+async def _deactivate(db: AsyncSession, in_chunk: tuple, now: datetime) -> int:
+    result = await db.execute(
+        update(Event)
+        .where(*in_chunk, Event.date_preview <= now, _next_occurrence(Event, now).is_(None))
+        .values(is_active=False, created_at=now)
+        .execution_options(**_NO_SYNC)
+    )
+    return result.rowcount or 0
+
+
+async def _expire_sql(db: AsyncSession, now: datetime) -> int:
+    """
+    Истечение без загрузки событий в Python. Кандидаты — строки с прошедшим
+    date_preview или next_occurrence_at (NULL — ещё не посчитан); идём по ним
+    кусками по id, в каждой транзакции обновляем даты оставшихся активными,
+    а у кого будущих дат нет — переносим в архив
+    (INSERT ... SELECT + DELETE ... RETURNING).
+    """
+    single = single_table()
+    model = Event if single else ActiveEvent
+    due = (
+        or_(model.date_preview <= now, model.next_occurrence_at <= now, model.next_occurrence_at.is_(None)),
+        *((Event.is_active,) if single else ()),
+    )
+    chunk_size = max(settings.expiry_chunk_size, 1)
+
+    moved = 0
+    after = 0
+    while True:
+        ids = (
+            await db.scalars(select(model.id).where(model.id > after, *due).order_by(model.id).limit(chunk_size))
+        ).all()
+        if not ids:
+            break
+        in_chunk = (model.id > after, model.id <= ids[-1], *due)
+        await _refresh_occurrences(db, model, in_chunk, now)
+        moved += await (_deactivate if single else _move_to_inactive)(db, in_chunk, now)
+        await db.commit()
+        if len(ids) < chunk_size:
+            break
+        after = ids[-1]
+    return moved
+
+
 async def move_expired_events(db: AsyncSession) -> int:
     now = datetime.now(timezone.utc)
+    if settings.expiry_sql:
+        # date_list и date_preview хранятся как naive UTC
+        return await _expire_sql(db, _as_storage(now))
+    if single_table():
+        return await _expire_single_table(db, now)
+
     result = await db.execute(select(ActiveEvent))
     active_events = result.scalars().all()
 
     moved = 0
-    updated_preview = 0
+    updated = 0
     for ev in active_events:
         next_date = _next_future_date(ev, now)
         current_preview = _to_aware(ev.date_preview)
-
-        if next_date and (not current_preview or current_preview <= now):
+        preview_moved = bool(next_date and (not current_preview or current_preview <= now))
+        if preview_moved:
             ev.date_preview = _as_storage(next_date)
-            type_model = TYPE_MODEL_MAP.get(ev.event_type)
-            if type_model:
-                type_event = await db.scalar(select(type_model).where(type_model.uuid == ev.uuid))
-                if type_event:
-                    type_event.date_preview = _as_storage(next_date)
-            updated_preview += 1
-            continue
 
+        # заодно заполняет next/last_occurrence_at у строк, записанных
+        # до появления этих колонок
+        bounds_changed = _refresh_bounds(ev, now)
         last_dt = _last_date(ev)
-        if last_dt and last_dt <= now:
-            db.add(
-                InactiveEvent(
-                    uuid=ev.uuid,
-                    source_id=ev.source_id,
-                    title=ev.title,
-                    description=ev.description,
-                    price=ev.price,
-                    date_preview=ev.date_preview,
-                    date_list=ev.date_list,
-                    place=ev.place,
-                    event_type=ev.event_type,
-                    genre=ev.genre,
-                    age=ev.age,
-                    image_url=ev.image_url,
-                    url=ev.url,
-                )
+        if next_date or not last_dt or last_dt > now:
+            # остаётся активным
+            if bounds_changed or preview_moved:
+                await _sync_type_event(db, ev)
+                updated += 1
+            continue
+
+        db.add(
+            InactiveEvent(
+                uuid=ev.uuid,
+                source_id=ev.source_id,
+                title=ev.title,
+                description=ev.description,
+                price=ev.price,
+                date_preview=ev.date_preview,
+                date_list=ev.date_list,
+                place=ev.place,
+                event_type=ev.event_type,
+                genre=ev.genre,
+                age=ev.age,
+                image_url=ev.image_url,
+                image_variants=ev.image_variants,
+                url=ev.url,
+                last_occurrence_at=ev.last_occurrence_at,
             )
+        )
 
-            type_model = TYPE_MODEL_MAP.get(ev.event_type)
-            if type_model:
-                await db.execute(delete(type_model).where(type_model.uuid == ev.uuid))
+        type_model = TYPE_MODEL_MAP.get(ev.event_type)
+        if type_model:
+            await db.execute(delete(type_model).where(type_model.uuid == ev.uuid))
 
-            await db.delete(ev)
-            moved += 1
+        await db.delete(ev)
+        moved += 1
 
-    if moved or updated_preview:
+    if moved or updated:
         await db.commit()
     else:
         await db.rollback()
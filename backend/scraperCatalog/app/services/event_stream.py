@@ -0,0 +1,75 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Literal
+from uuid import UUID
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.schemas.event import EventRead
+
+logger = logging.getLogger(__name__)
+
+StreamFormat = Literal["ndjson", "json"]
+
+NDJSON = "application/x-ndjson"
+JSON = "application/json"
+
+# те же поля, что у EventRead, но читаем их колонками, без ORM-объектов
+_FIELDS = list(EventRead.model_fields)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode(row) -> str:
+    return json.dumps(dict(zip(_FIELDS, row)), default=_default, ensure_ascii=False)
+
+
+def column_select(query: Select, model) -> Select:
+    """Тот же запрос (фильтры, порядок), но Core-колонками вместо сущности."""
+    table = model.__table__
+    return query.with_only_columns(*(table.c[name] for name in _FIELDS))
+
+
+async def _chunks(query: Select, fmt: StreamFormat) -> AsyncIterator[bytes]:
+    # сессия запроса (get_db) закрывается до того, как начнётся отдача тела,
+    # поэтому открываем свою на время стрима
+    separator = "\n" if fmt == "ndjson" else ","
+    first = True
+    if fmt == "json":
+        yield b"["
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=settings.stream_chunk_rows))
+            async for rows in result.partitions():
+                body = separator.join(_encode(row) for row in rows)
+                if fmt == "ndjson":
+                    body += "\n"
+                elif not first:
+                    body = "," + body
+                first = False
+                yield body.encode()
+    except Exception:
+        # статус уже отправлен, остаётся оборвать тело
+        logger.exception("Event stream aborted")
+        raise
+    if fmt == "json":
+        yield b"]"
+
+
+def stream_events(query: Select, model, fmt: StreamFormat) -> StreamingResponse:
+    """
+    Отдаём выборку по мере чтения серверным курсором (yield_per): в памяти
+    не больше stream_chunk_rows строк, первый байт уходит сразу.
+    """
+    media_type = NDJSON if fmt == "ndjson" else JSON
+    return StreamingResponse(_chunks(column_select(query, model), fmt), media_type=media_type)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.models.event import Event
+from app.services.check_active_events import move_expired_events
+from app.services.storage import active_model, single_table
+
+logger = logging.getLogger(__name__)
+
+
+async def next_due_at(db: AsyncSession) -> datetime | None:
+    """
+    Когда у активного события в следующий раз что-то наступит: пройдёт
+    date_preview или next_occurrence_at. Оба min — по индексам, без скана.
+    NULL в next_occurrence_at сроком не считается: такие строки заполняет
+    проход при старте, а оставшиеся после прохода NULL разрешить нечем —
+    иначе проходы шли бы каждые EXPIRY_MIN_SLEEP_SECONDS.
+    """
+    model = active_model()
+    active = (Event.is_active,) if single_table() else ()
+    candidates = [
+        await db.scalar(select(func.min(column)).where(*active))
+        for column in (model.next_occurrence_at, model.date_preview)
+    ]
+    candidates = [value for value in candidates if value is not None]
+    return min(candidates) if candidates else None
+
+
+async def run_expiry_pass() -> int | None:
+    """
+    Проход истечения под pg_try_advisory_lock: из всех реплик и воркеров
+    uvicorn работает один, остальные сразу получают None. Лок сессионный —
+    держится через коммиты кусков и снимается явно.
+    """
+    async with engine.connect() as conn:
+        locked = await conn.scalar(select(func.pg_try_advisory_lock(settings.expiry_lock_key)))
+        await conn.commit()
+        if not locked:
+            return None
+        try:
+            async with AsyncSession(bind=conn, expire_on_commit=False) as db:
+                return await move_expired_events(db)
+        finally:
+            await conn.rollback()
+            await conn.execute(select(func.pg_advisory_unlock(settings.expiry_lock_key)))
+            await conn.commit()
+
+
+def _sleep_seconds(due_at: datetime | None) -> float:
+    if due_at is None:
+        return settings.expiry_max_sleep_seconds
+    delay = (due_at - datetime.utcnow()).total_seconds()
+    return min(max(delay, settings.expiry_min_sleep_seconds), settings.expiry_max_sleep_seconds)
+
+
+async def run_expiry_scheduler() -> None:
+    while True:
+        try:
+            moved = await run_expiry_pass()
+            if moved:
+                logger.info("Expired %d events", moved)
+            async with AsyncSessionLocal() as db:
+                delay = _sleep_seconds(await next_due_at(db))
+        except Exception as exc:  # noqa: BLE001 - планировщик не должен умирать
+            logger.warning("Expiry pass failed: %s", exc)
+            delay = settings.expiry_max_sleep_seconds
+        await asyncio.sleep(delay)
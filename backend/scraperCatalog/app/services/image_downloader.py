@@ -1,15 +1,35 @@
 import asyncio
-from io import BytesIO
+import hashlib
+import logging
+from contextlib import AsyncExitStack
+from datetime import datetime
+from functools import partial
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 import aioboto3
 import httpx
-from PIL import Image, UnidentifiedImageError
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.config import settings
+from app.services import image_store
+from app.services.image_transcoder import ImageTranscodeError, transcode
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = 15.0
 
+# Общие на весь процесс клиенты: открываются в startup, закрываются в shutdown.
+_http_client: Optional[httpx.AsyncClient] = None
+_s3_client = None
+_s3_stack: Optional[AsyncExitStack] = None
+_clients_lock = asyncio.Lock()
+
+_global_slots = asyncio.Semaphore(max(settings.image_concurrency, 1))
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+# URL -> задача, которая его сейчас обрабатывает
+_inflight: Dict[str, asyncio.Task] = {}
+
 
 class ImageDownloadError(Exception):
     """Raised when we cannot download or save an image."""
@@ -19,17 +39,6 @@ class ImageDownloadError(Exception):
         self.status_code = status_code
 
 
-def _to_webp_bytes(image_bytes: bytes) -> bytes:
-    try:
-        with Image.open(BytesIO(image_bytes)) as img:
-            buf = BytesIO()
-            mode = "RGBA" if img.mode in ("RGBA", "LA") else "RGB"
-            img.convert(mode).save(buf, format="WEBP")
-            return buf.getvalue()
-    except UnidentifiedImageError as exc:
-        raise ImageDownloadError("failed to decode image for conversion") from exc
-
-
 def _build_public_url(key: str) -> str:
 
     if settings.s3_base_url:
@@ -38,40 +47,209 @@ def _build_public_url(key: str) -> str:
     
 
 
+async def start_image_clients() -> None:
+    global _http_client, _s3_client, _s3_stack  # noqa: PLW0603
+    async with _clients_lock:
+        if _http_client is None:
+            _http_client = httpx.AsyncClient(
+                timeout=DEFAULT_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=max(settings.image_concurrency, 1),
+                    max_keepalive_connections=max(settings.image_concurrency, 1),
+                ),
+            )
+        if _s3_client is None:
+            session = aioboto3.Session(
+                aws_access_key_id=settings.s3_access_key,
+                aws_secret_access_key=settings.s3_secret_key,
+                region_name=settings.s3_region,
+            )
+            _s3_stack = AsyncExitStack()
+            _s3_client = await _s3_stack.enter_async_context(
+                session.client(
+                    "s3",
+                    endpoint_url=settings.s3_endpoint,
+                    region_name=settings.s3_region,
+                )
+            )
+
+
+async def close_image_clients() -> None:
+    global _http_client, _s3_client, _s3_stack  # noqa: PLW0603
+    async with _clients_lock:
+        if _http_client is not None:
+            await _http_client.aclose()
+        if _s3_stack is not None:
+            await _s3_stack.aclose()
+        _http_client = None
+        _s3_client = None
+        _s3_stack = None
+
+
+def _host_slot(host: str) -> asyncio.Semaphore:
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(max(settings.image_host_concurrency, 1))
+    return slot
+
+
 async def _upload_to_s3(key: str, body: bytes) -> str:
-    session = aioboto3.Session(
-        aws_access_key_id=settings.s3_access_key,
-        aws_secret_access_key=settings.s3_secret_key,
-        region_name=settings.s3_region,
-    )
-    async with session.client(
-        "s3",
-        endpoint_url=settings.s3_endpoint,
-        region_name=settings.s3_region,
-    ) as client:
-        extra = {"ContentType": "image/webp"}
-        if settings.s3_acl:
-            extra["ACL"] = settings.s3_acl
-        await client.put_object(Bucket=settings.s3_bucket, Key=key, Body=body, **extra)
+    extra = {"ContentType": "image/webp"}
+    if settings.s3_acl:
+        extra["ACL"] = settings.s3_acl
+    await _s3_client.put_object(Bucket=settings.s3_bucket, Key=key, Body=body, **extra)
 
     return _build_public_url(key)
 
 
-async def download_image(image_url: str, filename_stem: str) -> str:
+def _variant_key(content_hash: str, variant: str) -> str:
+    suffix = "" if variant == "full" else f"_{variant}"
+    return f"images/{content_hash[:2]}/{content_hash}{suffix}.webp"
+
+
+def _public_urls(object_keys: Dict[str, str]) -> Dict[str, str]:
+    return {name: _build_public_url(key) for name, key in object_keys.items()}
+
+
+async def _fetch(image_url: str, headers: Dict[str, str]) -> Optional[Tuple[bytes, Optional[str], Optional[str]]]:
+    """
+    Качаем не больше settings.image_max_bytes, не дожидаясь конца тела.
+    None — источник ответил 304 на условный запрос; иначе (байты, ETag, Last-Modified).
+    """
+    try:
+        async with _http_client.stream("GET", image_url, headers=headers) as resp:
+            if resp.status_code == 304:
+                return None
+            if resp.status_code >= 400:
+                raise ImageDownloadError(f"failed to download image: status {resp.status_code}")
+            declared = resp.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > settings.image_max_bytes:
+                raise ImageDownloadError(f"image too large: {declared} bytes")
+            chunks = []
+            size = 0
+            async for chunk in resp.aiter_bytes():
+                size += len(chunk)
+                if size > settings.image_max_bytes:
+                    raise ImageDownloadError(f"image too large: over {settings.image_max_bytes} bytes")
+                chunks.append(chunk)
+    except httpx.HTTPError as exc:
+        raise ImageDownloadError(f"failed to download image: {exc}") from exc
+    return b"".join(chunks), resp.headers.get("etag"), resp.headers.get("last-modified")
+
+
+async def _transcode_and_upload(content: bytes, content_hash: str) -> Dict[str, str]:
+    try:
+        variants = await transcode(content)
+    except ImageTranscodeError as exc:
+        raise ImageDownloadError(str(exc)) from exc
+
+    object_keys = {name: _variant_key(content_hash, name) for name in variants}
+    await asyncio.gather(*(_upload_to_s3(object_keys[name], variants[name]) for name in variants))
+    return object_keys
+
+
+async def _resolve_image(image_url: str) -> Dict[str, str]:
+    """
+    Картинка по URL через image_store: свежая запись — сразу её ключи;
+    устаревшая — условный GET (304 ничего не стоит); новые байты с уже
+    известным хешем — переиспользуем ключи без перекодирования. Если по
+    URL пришла другая картинка, события со старой переводятся на новую.
+    Недоступный image_store не мешает: картинка просто обрабатывается заново.
+    """
+    try:
+        cached = await image_store.get_by_source_url(image_url)
+    except SQLAlchemyError as exc:
+        logger.warning("Image store lookup failed for %s: %s", image_url, exc)
+        cached = None
+
+    if cached is not None:
+        age = (datetime.utcnow() - cached.checked_at).total_seconds()
+        if age < settings.image_recheck_seconds:
+            return _public_urls(cached.object_keys)
+
+    headers = {}
+    if cached is not None and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached is not None and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    async with _global_slots:
+        async with _host_slot(urlparse(image_url).netloc.lower()):
+            fetched = await _fetch(image_url, headers)
+
+        if fetched is None:
+            try:
+                await image_store.mark_checked(image_url)
+            except SQLAlchemyError as exc:
+                logger.warning("Could not mark image %s as checked: %s", image_url, exc)
+            return _public_urls(cached.object_keys)
+
+        content, etag, last_modified = fetched
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_keys = None
+        if cached is not None and cached.content_hash == content_hash:
+            object_keys = cached.object_keys
+        else:
+            try:
+                object_keys = await image_store.get_keys_by_hash(content_hash)
+            except SQLAlchemyError as exc:
+                logger.warning("Image store lookup by hash failed for %s: %s", image_url, exc)
+        if object_keys is None:
+            object_keys = await _transcode_and_upload(content, content_hash)
+
+    variants = _public_urls(object_keys)
+    try:
+        await image_store.save(image_url, content_hash, object_keys, etag, last_modified)
+        if cached is not None and cached.content_hash != content_hash:
+            moved = await image_store.repoint_events(
+                cached.content_hash, _public_urls(cached.object_keys)["full"], variants
+            )
+            logger.info("Image %s changed at source, repointed %d event rows", image_url, moved)
+    except SQLAlchemyError as exc:
+        logger.warning("Could not remember image %s: %s", image_url, exc)
+    return variants
+
+
+def _forget(image_url: str, task: asyncio.Task) -> None:
+    _inflight.pop(image_url, None)
+    if not task.cancelled():
+        task.exception()
+
+
+async def download_image_variants(image_url: str) -> Dict[str, str]:
+    """
+    Ссылки на WebP-варианты картинки (см. image_transcoder.VARIANTS).
+    Один и тот же URL, запрошенный одновременно, обрабатывается один раз.
+    """
     parsed = urlparse(image_url)
     if parsed.scheme not in {"http", "https"}:
         raise ImageDownloadError("image_url must use http or https scheme", status_code=400)
 
-    async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, follow_redirects=True) as client:
-        try:
-            resp = await client.get(image_url)
-        except httpx.HTTPError as exc:
-            raise ImageDownloadError(f"failed to download image: {exc}") from exc
-        if resp.status_code >= 400:
-            raise ImageDownloadError(f"failed to download image: status {resp.status_code}")
-        content = resp.content
-
-    webp_bytes = await asyncio.to_thread(_to_webp_bytes, content)
-    key = f"{filename_stem}.webp".lstrip("/")
-    return await _upload_to_s3(key, webp_bytes)
-
+    if _http_client is None or _s3_client is None:
+        # вне приложения (скрипты, бенчмарки) клиенты поднимаем при первом вызове
+        await start_image_clients()
+
+    task = _inflight.get(image_url)
+    if task is None:
+        task = _inflight[image_url] = asyncio.create_task(_resolve_image(image_url))
+        task.add_done_callback(partial(_forget, image_url))
+    return await asyncio.shield(task)
+
+
+def prefetch_images(images: Dict[str, str]) -> Dict[str, asyncio.Task]:
+    """
+    Запускаем download_image_variants для всей пачки сразу:
+    ключ -> image_url превращается в ключ -> задача.
+    Ограничения — общий семафор и семафор на хост, так что пачка занимает
+    примерно время самой медленной картинки.
+    """
+    return {key: asyncio.create_task(download_image_variants(url)) for key, url in images.items()}
+
+
+async def cancel_prefetched(tasks: Dict[str, asyncio.Task]) -> None:
+    pending = [task for task in tasks.values() if not task.done()]
+    for task in pending:
+        task.cancel()
+    # забираем результаты, чтобы не было "exception was never retrieved"
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
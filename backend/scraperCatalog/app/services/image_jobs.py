@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.event import ActiveEvent, BestEvents, Event, InactiveEvent
+from app.models.image import ImageJob
+from app.services.check_active_events import TYPE_MODEL_MAP
+from app.services.image_downloader import ImageDownloadError, download_image_variants
+from app.services.storage import single_table
+
+logger = logging.getLogger(__name__)
+
+
+def deferred_images(image_mode: str | None = None) -> bool:
+    return (image_mode or settings.image_mode) == "deferred"
+
+
+async def enqueue(db: AsyncSession, event_uuid: UUID, source_url: str) -> None:
+    await enqueue_many(db, [(event_uuid, source_url)])
+
+
+async def enqueue_many(db: AsyncSession, jobs: List[Tuple[UUID, str]]) -> None:
+    """
+    Ставим картинки событий в очередь в текущей транзакции: события
+    и задания коммитятся вместе. Повтор для того же uuid перезапускает
+    задание с новым URL.
+    """
+    if not jobs:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"event_uuid": event_uuid, "source_url": source_url, "status": "pending", "attempts": 0, "next_attempt_at": now}
+        for event_uuid, source_url in jobs
+    ]
+    stmt = insert(ImageJob).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ImageJob.event_uuid],
+        set_={
+            "source_url": stmt.excluded.source_url,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": stmt.excluded.next_attempt_at,
+            "last_error": None,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def claim(limit: int) -> List[Row]:
+    """
+    Забираем созревшие задания (и processing с истёкшей арендой — воркер
+    умер) и сразу продлеваем им аренду. SKIP LOCKED: реплики не ждут
+    друг друга и не берут одно задание дважды.
+    """
+    now = datetime.utcnow()
+    due = (
+        select(ImageJob.id)
+        .where(ImageJob.status.in_(("pending", "processing")), ImageJob.next_attempt_at <= now)
+        .order_by(ImageJob.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(ImageJob)
+        .where(ImageJob.id.in_(due.scalar_subquery()))
+        .values(status="processing", next_attempt_at=now + timedelta(seconds=settings.image_job_lease_seconds))
+        .returning(ImageJob.id, ImageJob.event_uuid, ImageJob.source_url, ImageJob.attempts)
+    )
+    async with AsyncSessionLocal() as db:
+        jobs = (await db.execute(stmt)).all()
+        await db.commit()
+    return jobs
+
+
+async def _set_event_image(db: AsyncSession, event_uuid: UUID, values: Dict[str, Any]) -> None:
+    if single_table():
+        for model in (Event, BestEvents):
+            await db.execute(update(model).where(model.uuid == event_uuid).values(**values))
+        return
+    event_type = await db.scalar(
+        update(ActiveEvent).where(ActiveEvent.uuid == event_uuid).values(**values).returning(ActiveEvent.event_type)
+    )
+    type_model = TYPE_MODEL_MAP.get(event_type)
+    for model in (InactiveEvent, BestEvents, *([type_model] if type_model else [])):
+        await db.execute(update(model).where(model.uuid == event_uuid).values(**values))
+
+
+def _still_ours(job: Row):
+    # задание могли перезапустить с новым URL, пока мы качали старый
+    return (ImageJob.id == job.id, ImageJob.status == "processing", ImageJob.source_url == job.source_url)
+
+
+async def complete(job: Row, variants: Dict[str, str]) -> None:
+    async with AsyncSessionLocal() as db:
+        removed = await db.scalar(delete(ImageJob).where(*_still_ours(job)).returning(ImageJob.id))
+        if removed is not None:
+            values = {"image_url": variants["full"], "image_variants": variants, "image_status": "ready"}
+            await _set_event_image(db, job.event_uuid, values)
+        await db.commit()
+
+
+def _backoff_seconds(attempts: int) -> float:
+    delay = settings.image_job_backoff_base_seconds * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.image_job_backoff_max_seconds)
+
+
+async def fail(job: Row, error: str) -> None:
+    attempts = job.attempts + 1
+    exhausted = attempts >= settings.image_job_max_attempts
+    values = {"attempts": attempts, "last_error": error}
+    if exhausted:
+        values["status"] = "failed"
+    else:
+        values["status"] = "pending"
+        values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=_backoff_seconds(attempts))
+
+    async with AsyncSessionLocal() as db:
+        updated = await db.scalar(update(ImageJob).where(*_still_ours(job)).values(**values).returning(ImageJob.id))
+        if updated is not None and exhausted:
+            # событие остаётся со ссылкой источника
+            await _set_event_image(db, job.event_uuid, {"image_status": "failed"})
+        await db.commit()
+
+
+async def _process(job: Row) -> None:
+    try:
+        variants = await download_image_variants(job.source_url)
+        await complete(job, variants)
+    except ImageDownloadError as exc:
+        logger.info("Image job %s failed (attempt %d): %s", job.id, job.attempts + 1, exc)
+        await fail(job, str(exc))
+    except Exception as exc:  # noqa: BLE001 - S3, транскодер, БД: считаем попыткой
+        logger.exception("Image job %s crashed (attempt %d)", job.id, job.attempts + 1)
+        await fail(job, repr(exc))
+
+
+async def run_image_worker() -> None:
+    poll = max(settings.image_job_poll_seconds, 0.1)
+    while True:
+        try:
+            jobs = await claim(settings.image_job_batch)
+            results = await asyncio.gather(*(_process(job) for job in jobs), return_exceptions=True)
+            for job, result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    logger.warning("Image job %s crashed: %s", job.id, result)
+        except Exception as exc:  # noqa: BLE001 - воркер не должен умирать
+            logger.warning("Image worker iteration failed: %s", exc)
+            jobs = []
+        if len(jobs) < settings.image_job_batch:
+            await asyncio.sleep(poll)
+
+
+async def stats() -> Dict[str, int]:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(ImageJob.status, func.count()).group_by(ImageJob.status))).all()
+    return {status: count for status, count in rows}
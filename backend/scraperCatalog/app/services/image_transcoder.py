@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from io import BytesIO
+from typing import Dict, Optional, Sequence, Tuple
+
+from PIL import Image, UnidentifiedImageError
+
+from app.config import settings
+
+# Варианты картинки: имя -> наибольшая сторона. Меньше исходника не растягиваем.
+VARIANTS: Tuple[Tuple[str, int], ...] = (
+    ("full", 1920),
+    ("card", 800),
+    ("thumbnail", 320),
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+class ImageTranscodeError(Exception):
+    pass
+
+
+def transcode_variants(
+    image_bytes: bytes,
+    variants: Sequence[Tuple[str, int]],
+    max_pixels: int,
+    quality: int,
+) -> Dict[str, bytes]:
+    """
+    Выполняется в процессе пула: декодируем один раз (JPEG сразу в
+    уменьшенном масштабе через draft) и ужимаем от большего варианта
+    к меньшему, каждый сохраняем в WebP.
+    """
+    ordered = sorted(variants, key=lambda item: item[1], reverse=True)
+    try:
+        with Image.open(BytesIO(image_bytes)) as img:
+            # размеры известны из заголовка, пиксели ещё не распакованы
+            if img.width * img.height > max_pixels:
+                raise ImageTranscodeError(f"image too large: {img.width}x{img.height}")
+            img.draft(None, (ordered[0][1], ordered[0][1]))
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            current = img.convert("RGBA" if has_alpha else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise ImageTranscodeError(f"failed to decode image for conversion: {exc}") from exc
+
+    result = {}
+    for name, side in ordered:
+        current = current.copy()
+        current.thumbnail((side, side), Image.Resampling.LANCZOS)
+        buf = BytesIO()
+        current.save(buf, format="WEBP", quality=quality, method=4)
+        result[name] = buf.getvalue()
+    return result
+
+
+def start_transcoder(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    global _executor  # noqa: PLW0603
+    if _executor is None:
+        # spawn: не форкаем процесс с работающим event loop и открытыми сокетами
+        _executor = ProcessPoolExecutor(
+            max_workers=max(workers or settings.image_transcode_workers, 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_transcoder() -> None:
+    global _executor  # noqa: PLW0603
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def transcode(image_bytes: bytes) -> Dict[str, bytes]:
+    if len(image_bytes) > settings.image_max_bytes:
+        raise ImageTranscodeError(f"image too large: {len(image_bytes)} bytes")
+
+    job = partial(
+        transcode_variants,
+        image_bytes,
+        VARIANTS,
+        settings.image_max_pixels,
+        settings.image_webp_quality,
+    )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(start_transcoder(), job)
+    except BrokenProcessPool as exc:
+        # воркер убит (например, OOM) — пул больше не принимает задачи, пересоздаём
+        shutdown_transcoder()
+        raise ImageTranscodeError("image transcoder crashed") from exc
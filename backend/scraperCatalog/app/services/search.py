@@ -0,0 +1,23 @@
+from sqlalchemy import bindparam, func, literal_column, or_
+from sqlalchemy.sql import Select
+
+from app.models.event import SEARCH_CONFIG
+from app.services.storage import active_events, active_model
+
+
+def search_events(text: str, event_type: str | None, limit: int) -> Select:
+    """
+    Поиск по активным событиям: совпадение по tsvector (websearch-синтаксис,
+    морфология русского) или похожесть слова в title через pg_trgm — так
+    находятся и формы слов, и опечатки. Оба условия идут по GIN-индексам
+    (BitmapOr), сортировка — по сумме ts_rank_cd и word_similarity.
+    """
+    model = active_model()
+    phrase = bindparam("phrase", text)
+    query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), phrase)
+    rank = func.ts_rank_cd(model.search_vector, query) + func.word_similarity(phrase, model.title)
+
+    stmt = active_events().where(or_(model.search_vector.op("@@")(query), phrase.op("<%")(model.title)))
+    if event_type is not None:
+        stmt = stmt.where(model.event_type == event_type)
+    return stmt.order_by(rank.desc(), model.id).limit(limit)
@@ -0,0 +1,82 @@
+import logging
+
+from sqlalchemy import exists, false, func, select, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.config import settings
+from app.models.event import ActiveEvent, Event, EventMixin, InactiveEvent
+
+logger = logging.getLogger(__name__)
+
+# Колонки, общие для всех таблиц событий, кроме id.
+COPY_COLUMNS = [
+    name
+    for name, column in vars(EventMixin).items()
+    if hasattr(column, "key") and name != "id"
+]
+
+
+def single_table() -> bool:
+    return settings.storage_mode == "single"
+
+
+def active_model():
+    """Модель, в которой лежат активные события (для условий по uuid/id)."""
+    return Event if single_table() else ActiveEvent
+
+
+def active_events() -> Select:
+    if single_table():
+        return select(Event).where(Event.is_active)
+    return select(ActiveEvent)
+
+
+def inactive_events() -> Select:
+    if single_table():
+        return select(Event).where(~Event.is_active)
+    return select(InactiveEvent)
+
+
+async def _copy_into_events(db: AsyncSession, source, is_active, keep_id: bool, *where) -> int:
+    names = ["id", *COPY_COLUMNS] if keep_id else COPY_COLUMNS
+    stmt = (
+        insert(Event)
+        .from_select([*names, "is_active"], select(*(getattr(source, name) for name in names), is_active).where(*where))
+        .on_conflict_do_nothing(index_elements=["uuid"])
+    )
+    result = await db.execute(stmt)
+    return result.rowcount or 0
+
+
+async def backfill_events_table(db: AsyncSession) -> int:
+    """
+    Переход split -> single: один раз копируем active и inactive в events
+    (INSERT ... SELECT, повторный запуск ничего не дублирует).
+    id активных событий сохраняем: на них ссылаются ?id=, post-best и кэш
+    catalog. У inactive своя последовательность, поэтому их id сохраняем,
+    только если он не занят активным, остальные получают новый id уже
+    после того, как последовательность events выставлена за max(id).
+    """
+    if await db.scalar(select(exists().select_from(Event))):
+        return 0
+
+    copied = await _copy_into_events(db, ActiveEvent, true(), True)
+    copied += await _copy_into_events(
+        db, InactiveEvent, false(), True, ~exists().where(Event.id == InactiveEvent.id)
+    )
+    await db.execute(
+        select(
+            func.setval(
+                func.pg_get_serial_sequence(Event.__tablename__, "id"),
+                select(func.coalesce(func.max(Event.id), 0) + 1).scalar_subquery(),
+                false(),
+            )
+        )
+    )
+    # inactive с занятым id: уже скопированные отсечёт конфликт по uuid
+    copied += await _copy_into_events(db, InactiveEvent, false(), False)
+    await db.commit()
+    logger.info("Backfilled %d events into the single events table", copied)
+    return copied
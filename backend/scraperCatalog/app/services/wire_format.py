@@ -0,0 +1,86 @@
+import json
+import zlib
+from io import BytesIO
+from typing import Any, Dict, List
+
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack необязателен, остаётся JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - без zstd остаётся gzip
+    zstandard = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+
+def supported_formats() -> Dict[str, List[str]]:
+    """То, что scraper может слать на upload/update: тип тела и сжатие."""
+    content_types = [MSGPACK, JSON] if msgpack is not None else [JSON]
+    encodings = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    return {"content_types": content_types, "encodings": encodings}
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="request body too large")
+
+
+def _decompress(raw: bytes, encoding: str) -> bytes:
+    limit = settings.upload_max_bytes
+    if encoding in ("", "identity"):
+        return raw
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(raw, limit + 1)
+        except zlib.error as exc:
+            raise HTTPException(status_code=400, detail="bad gzip body") from exc
+    elif encoding == "zstd" and zstandard is not None:
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(BytesIO(raw)) as reader:
+                body = reader.read(limit + 1)
+        except zstandard.ZstdError as exc:
+            raise HTTPException(status_code=400, detail="bad zstd body") from exc
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"unsupported content-encoding: {encoding}",
+        )
+    # не даём маленькому сжатому телу развернуться в гигабайты
+    if len(body) > limit:
+        raise _too_large()
+    return body
+
+
+async def decode_request_body(request: Request) -> Any:
+    """
+    Разбираем тело по Content-Type (JSON / msgpack) и Content-Encoding
+    (gzip / zstd). Без заголовков — обычный JSON, как раньше.
+    """
+    raw = await request.body()
+    if len(raw) > settings.upload_max_bytes:
+        raise _too_large()
+
+    encoding = request.headers.get("content-encoding", "").strip().lower()
+    body = _decompress(raw, encoding)
+
+    content_type = request.headers.get("content-type", JSON).split(";")[0].strip().lower()
+    try:
+        if content_type == MSGPACK and msgpack is not None:
+            return msgpack.unpackb(body, raw=False)
+        if content_type in (JSON, ""):
+            return json.loads(body)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="malformed request body") from exc
+
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"unsupported content-type: {content_type}",
+    )
@@ -0,0 +1,95 @@
+"""
+Бенчмарк перекодирования картинок: сколько картинок в секунду даёт
+пул процессов при разном числе воркеров против прежнего варианта
+(asyncio.to_thread, один WebP в полном разрешении).
+
+Картинки синтетические (JPEG с шумом и градиентом), S3 и сеть не
+участвуют — меряем только CPU-часть.
+
+    cd backend/scraperCatalog
+    python benchmarks/image_transcode.py --images 64 --size 3000x2000 --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from PIL import Image  # noqa: E402
+
+from app.services import image_transcoder  # noqa: E402
+
+
+def _sample_image(width: int, height: int, seed: int) -> bytes:
+    noise = Image.effect_noise((width, height), 40 + seed % 20).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    buf = BytesIO()
+    Image.blend(noise, gradient, 0.5).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _legacy_webp(image_bytes: bytes) -> bytes:
+    """Старый _to_webp_bytes: полное разрешение, один вариант."""
+    with Image.open(BytesIO(image_bytes)) as img:
+        buf = BytesIO()
+        mode = "RGBA" if img.mode in ("RGBA", "LA") else "RGB"
+        img.convert(mode).save(buf, format="WEBP")
+        return buf.getvalue()
+
+
+async def _run_threads(images: list, concurrency: int) -> float:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(data: bytes) -> None:
+        async with slots:
+            await asyncio.to_thread(_legacy_webp, data)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(data) for data in images))
+    return time.perf_counter() - started
+
+
+async def _run_pool(images: list, workers: int) -> float:
+    image_transcoder.shutdown_transcoder()
+    image_transcoder.start_transcoder(workers)
+    # прогрев: spawn-процессы импортируют Pillow при первом вызове
+    await asyncio.gather(*(image_transcoder.transcode(images[0]) for _ in range(workers)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(image_transcoder.transcode(data) for data in images))
+    elapsed = time.perf_counter() - started
+    image_transcoder.shutdown_transcoder()
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--size", default="3000x2000", help="WxH исходных картинок")
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 4}")
+    args = parser.parse_args()
+
+    width, height = (int(part) for part in args.size.lower().split("x"))
+    print(f"generating {args.images} images {width}x{height}...")
+    images = [_sample_image(width, height, i) for i in range(args.images)]
+    workers_list = [int(item) for item in args.workers.split(",") if item]
+
+    for workers in workers_list:
+        elapsed = await _run_threads(images, workers)
+        print(f"threads   workers={workers:<3} {args.images / elapsed:7.2f} img/s (1 full-size variant)")
+    for workers in workers_list:
+        elapsed = await _run_pool(images, workers)
+        print(
+            f"processes workers={workers:<3} {args.images / elapsed:7.2f} img/s "
+            f"({len(image_transcoder.VARIANTS)} variants)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())